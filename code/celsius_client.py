@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+# celsius_client.py -- Thin client for the to_celsius.py conversion server.
+#
+# Usage: celsius_client.py socket temp1 temp2 ...
+#
+# Start the server with "to_celsius.py --serve socket".  This script
+# only needs ConversionClient and print_results() from to_celsius.py,
+# which imports nothing else at startup, so it starts up about as
+# quickly as Python allows.  The protocol is simple enough to use from
+# the shell without Python at all: send a line of whitespace-separated
+# Fahrenheit values, and the server replies with a line of Celsius
+# values in the same order, with '?' for non-numeric values, e.g.
+#
+#     $ echo '32 212 abc' | nc -U socket
+#     0.0 100.0 ?
+#
+
+import sys
+
+from to_celsius import ConversionClient, print_results
+
+def main():
+    if len(sys.argv) < 3:
+        print('Usage: {} socket temp1 temp2 ...'.format(sys.argv[0]))
+        sys.exit(0)
+
+    args = sys.argv[2:]
+    with ConversionClient(sys.argv[1]) as client:
+        print_results(args, client.convert(args))
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
 
+import argparse
+import atexit
+import collections
 import math
+import sys
+import threading
+import traceback
 from turtle import *
 
+import profiling
+import render
+
 # The gravitational constant G
 G = 6.67428e-11
 
@@ -17,12 +26,31 @@ class Body(Turtle):
     mass : mass in kg
     vx, vy: x, y velocities in m/s
     px, py: x, y positions in m
+    dot_color: color used to draw the body; if None, the pen color
     """
     
     name = 'Body'
     mass = None
     vx = vy = 0.0
     px = py = 0.0
+    dot_color = None
+
+    @classmethod
+    def headless(cls):
+        """(): Body
+
+        Returns a Body without a turtle, for drawing on a render target.
+        Skipping Turtle.__init__ means no Tk screen is created, so the
+        turtle methods mustn't be used; set 'dot_color' instead of
+        calling pencolor().
+        """
+        return cls.__new__(cls)
+
+    def draw_color(self):
+        "Returns the color in which to draw the body."
+        if self.dot_color is not None:
+            return self.dot_color
+        return self.pencolor()
     
     def attraction(self, other):
         """(Body): (fx, fy)
@@ -56,10 +84,15 @@ class Body(Turtle):
         fy = math.sin(theta) * f
         return fx, fy
 
+# The position and velocity of a body at one moment, as recorded by
+# the simulation thread of decoupled_loop() for the display to print.
+BodyState = collections.namedtuple('BodyState', 'name px py vx vy')
+
 def update_info(step, bodies):
     """(int, [Body])
     
     Displays information about the status of the simulation.
+    'bodies' may also be a list of BodyState snapshots.
     """
     print('Step #{}'.format(step))
     for body in bodies:
@@ -68,39 +101,49 @@ def update_info(step, bodies):
         print(s)
     print()
 
-def loop(bodies):
-    """([Body])
+def compute_forces(bodies):
+    """([Body]): {Body: (fx, fy)}
 
-    Never returns; loops through the simulation, updating the
-    positions of all the provided bodies.
+    Returns a dictionary giving the total force exerted upon
+    each body by all of the others.
     """
-    timestep = 24*3600  # One day
-    
-    for body in bodies:
-        body.penup()
-        body.hideturtle()
+    # This is the same calculation as Body.attraction(), written out
+    # for speed.  Each pair of bodies is visited only once, since the
+    # force on the second body is equal and opposite to the force on
+    # the first.
+    n = len(bodies)
+    px = [body.px for body in bodies]
+    py = [body.py for body in bodies]
+    mass = [body.mass for body in bodies]
+    fx = [0.0] * n
+    fy = [0.0] * n
+    for i in range(n):
+        sx, sy, gm = px[i], py[i], G * mass[i]
+        for j in range(i+1, n):
+            dx = px[j] - sx
+            dy = py[j] - sy
+            d2 = dx*dx + dy*dy
+            if d2 == 0:
+                raise ValueError("Collision between objects %r and %r"
+                                 % (bodies[i].name, bodies[j].name))
+            # The force is G*m1*m2/d2, along the unit vector (dx, dy)/d.
+            f = gm * mass[j] / (d2 * math.sqrt(d2))
+            fx[i] += f * dx
+            fy[i] += f * dy
+            fx[j] -= f * dx
+            fy[j] -= f * dy
+    return {body: (fx[i], fy[i]) for i, body in enumerate(bodies)}
 
-    step = 1
-    while True:
-        update_info(step, bodies)
-        step += 1
+def advance(bodies, timestep, force_engine, profiler):
+    """([Body], float, function, Profiler)
 
-        force = {}
-        for body in bodies:
-            # Add up all of the forces exerted on 'body'.
-            total_fx = total_fy = 0.0
-            for other in bodies:
-                # Don't calculate the body's attraction to itself
-                if body is other:
-                    continue
-                fx, fy = body.attraction(other)
-                total_fx += fx
-                total_fy += fy
-
-            # Record the total force exerted.
-            force[body] = (total_fx, total_fy)
-
-        # Update velocities based upon on the force.
+    Moves the bodies forward by one time step.
+    """
+    with profiler.phase('forces'):
+        force = force_engine(bodies)
+
+    # Update velocities based upon on the force.
+    with profiler.phase('integrate'):
         for body in bodies:
             fx, fy = force[body]
             body.vx += fx / body.mass * timestep
@@ -109,33 +152,229 @@ def loop(bodies):
             # Update positions
             body.px += body.vx * timestep
             body.py += body.vy * timestep
-            body.goto(body.px*SCALE, body.py*SCALE)
-            body.dot(3)
 
+def loop(bodies, target=None, profiler=None, force_engine=None,
+         steps=None):
+    """([Body], target, Profiler, function, int)
 
-def main():
-    sun = Body()
-    sun.name = 'Sun'
-    sun.mass = 1.98892 * 10**30
-    sun.pencolor('yellow')
-
-    earth = Body()
-    earth.name = 'Earth'
-    earth.mass = 5.9742 * 10**24
+    Loops through the simulation, updating the positions of all the
+    provided bodies, for the given number of steps or, if 'steps' is
+    None, forever.  Each step's dots are drawn in a single batch on
+    'target', a render target, or on the turtle screen if no target is
+    supplied.  The time spent in each part of a step is recorded by
+    'profiler', if supplied.  The forces are computed by
+    'force_engine', which defaults to compute_forces().
+    """
+    timestep = 24*3600  # One day
+    
+    if target is None:
+        for body in bodies:
+            body.penup()
+            body.hideturtle()
+        target = render.CanvasTarget(getscreen())
+    if profiler is None:
+        profiler = profiling.Profiler()
+    if force_engine is None:
+        force_engine = compute_forces
+
+    colors = [body.draw_color() for body in bodies]
+    step = 1
+    while steps is None or step <= steps:
+        with profiler.phase('info'):
+            update_info(step, bodies)
+        step += 1
+
+        advance(bodies, timestep, force_engine, profiler)
+
+        with profiler.phase('render'):
+            frame = render.Frame()
+            for body, color in zip(bodies, colors):
+                frame.dot(body.px*SCALE, body.py*SCALE, 3, color)
+            target.flush(frame)
+
+        profiler.count('steps')
+        profiler.tick()
+
+
+class Trails:
+    """Keeps the most recent screen positions of each body.
+
+    The simulation thread calls add() after every step, and the
+    display calls latest() once per frame to get the trail of each
+    body, which is at most 'length' points long; older points are
+    dropped, so memory use and drawing time stay the same however long
+    the simulation runs.  Points less than 'min_distance' pixels from
+    the previous point of a trail are skipped.  Each call to add() may
+    also pass some information about the step, such as a snapshot of
+    the bodies, which latest() hands back along with the trails.
+
+    Methods:
+    add(points, info) -- record one (x, y) point for each body
+    latest() -- return a copy of each body's trail, along with the
+                latest info
+    """
+    def __init__(self, num_bodies, min_distance=0.5, length=1000):
+        self.lock = threading.Lock()
+        self.min_distance = min_distance
+        self.trails = [collections.deque(maxlen=length)
+                       for i in range(num_bodies)]
+        self.info = None
+
+    def add(self, points, info=None):
+        with self.lock:
+            self.info = info
+            for trail, (x, y) in zip(self.trails, points):
+                if trail:
+                    last_x, last_y = trail[-1]
+                    if math.hypot(x - last_x, y - last_y) < self.min_distance:
+                        continue
+                trail.append((x, y))
+
+    def latest(self):
+        with self.lock:
+            return [list(trail) for trail in self.trails], self.info
+
+def decoupled_loop(bodies, fps=30, target=None, profiler=None,
+                   force_engine=None):
+    """([Body], int, target, Profiler, function)
+
+    Never returns; runs the simulation as quickly as possible in a
+    separate thread, while the display shows the latest positions
+    'fps' times a second.  Each frame replaces the previous one,
+    drawing the recent trail of each body as a single line.  The other
+    arguments
+    are as for loop().  If the simulation raises an exception, such as
+    the ValueError for a collision, the traceback is printed and the
+    display stops updating.
+    """
+    timestep = 24*3600  # One day
+
+    if target is None:
+        for body in bodies:
+            body.penup()
+            body.hideturtle()
+        target = render.CanvasTarget(getscreen())
+    if profiler is None:
+        profiler = profiling.Profiler()
+    if force_engine is None:
+        force_engine = compute_forces
+
+    colors = [body.draw_color() for body in bodies]
+    trails = Trails(len(bodies))
+    error = None
+
+    def simulate():
+        # Only this thread touches the bodies; the display works from
+        # the points and snapshots passed through 'trails'.
+        nonlocal error
+        step = 1
+        try:
+            while True:
+                advance(bodies, timestep, force_engine, profiler)
+                step += 1
+                trails.add([(body.px*SCALE, body.py*SCALE)
+                            for body in bodies],
+                           (step, [BodyState(body.name, body.px, body.py,
+                                             body.vx, body.vy)
+                                   for body in bodies]))
+                profiler.count('steps')
+                profiler.tick()
+        except Exception as exc:
+            error = exc
+
+    def draw_frame():
+        # Read the error before taking the trails, so that the final
+        # points are drawn.
+        failed = error
+        paths, info = trails.latest()
+        if info is not None:
+            update_info(*info)
+        # Clearing the previous frame keeps the number of canvas items
+        # and points constant.
+        frame = render.Frame()
+        frame.clear()
+        for i, points in enumerate(paths):
+            if len(points) == 1:
+                frame.dot(points[0][0], points[0][1], 3, colors[i])
+            else:
+                frame.line(points, colors[i], 3)
+        target.flush(frame)
+        if failed is not None:
+            print('Simulation stopped:', file=sys.stderr)
+            traceback.print_exception(type(failed), failed,
+                                      failed.__traceback__)
+            return
+        ontimer(draw_frame, 1000 // fps)
+
+    thread = threading.Thread(target=simulate, daemon=True)
+    thread.start()
+    draw_frame()
+    mainloop()
+
+
+def make_bodies(headless=False):
+    """(bool): [Body]
+
+    Returns the Sun, Earth and Venus.  If 'headless' is true, the
+    bodies have no turtles, so no window is opened.
+    """
+    def new_body(name, mass, color):
+        if headless:
+            body = Body.headless()
+        else:
+            body = Body()
+            body.pencolor(color)
+        body.name = name
+        body.mass = mass
+        body.dot_color = color
+        return body
+
+    sun = new_body('Sun', 1.98892 * 10**30, 'yellow')
+
+    earth = new_body('Earth', 5.9742 * 10**24, 'blue')
     earth.px = -1*AU
     earth.vy = 29.783 * 1000            # 29.783 km/sec
-    earth.pencolor('blue')
 
     # Venus parameters taken from
     # http://nssdc.gsfc.nasa.gov/planetary/factsheet/venusfact.html
-    venus = Body()
-    venus.name = 'Venus'
-    venus.mass = 4.8685 * 10**24
+    venus = new_body('Venus', 4.8685 * 10**24, 'red')
     venus.px = 0.723 * AU
     venus.vy = -35.02 * 1000
-    venus.pencolor('red')
 
-    loop([sun, earth, venus])
+    return [sun, earth, venus]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='simulate the orbits of Venus and the Earth')
+    parser.add_argument('--profile', default=False, action='store_true',
+                        help='periodically write phase timings to stderr '
+                             'as JSON')
+    parser.add_argument('--fps', default=None, type=int, metavar='int',
+                        help='simulate as quickly as possible and update '
+                             'the display this many times a second')
+    parser.add_argument('--output', default=None, metavar='file',
+                        help='draw the orbits in an image file '
+                             '(.png, .svg, or .ps) without opening a window')
+    parser.add_argument('--steps', default=365, type=int, metavar='int',
+                        help='number of days to simulate with --output '
+                             '(default: 365)')
+    args = parser.parse_args()
+
+    profiler = profiling.Profiler(enabled=args.profile)
+    atexit.register(profiler.dump)
+
+    if args.output is not None:
+        # Large enough for the Earth's orbit, 250 pixels from the Sun.
+        target = render.ImageTarget(600, 600)
+        loop(make_bodies(headless=True), target, profiler, steps=args.steps)
+        target.save(args.output)
+        return
+
+    bodies = make_bodies()
+    if args.fps:
+        decoupled_loop(bodies, args.fps, profiler=profiler)
+    else:
+        loop(bodies, profiler=profiler)
 
 if __name__ == '__main__':
     main()
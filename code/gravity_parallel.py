@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+# gravity_parallel.py -- Compute gravitational forces on several CPUs.
+#
+# The positions and masses of the bodies are kept in a block of shared
+# memory that every worker process can read, so nothing needs to be
+# pickled and sent to the workers on each step.  Each worker computes
+# the total force on its own range of bodies and writes the results
+# back into the shared block.  Two barriers keep the main process and
+# the workers in step: one to start a step, and one to finish it.  If a
+# worker dies, a monitoring thread aborts the barriers, so the main
+# process gets an error instead of waiting for it forever.
+#
+# Usage:
+#
+#     with ParallelForces(len(bodies)) as engine:
+#         gravity.loop(bodies, force_engine=engine)
+#
+
+import array
+import math
+import multiprocessing
+import os
+import threading
+from multiprocessing import connection, shared_memory
+
+import gravity
+
+# Layout of the shared block, as 5*N+2 doubles: the x positions,
+# y positions, and masses of the N bodies, then the x and y forces on
+# them, then a pair of slots recording a collision between bodies.
+PX, PY, MASS, FX, FY = range(5)
+
+def _worker(shm_name, n, start, end, start_barrier, done_barrier):
+    """(str, int, int, int, Barrier, Barrier)
+
+    Worker process: computes the forces on bodies start..end-1 on
+    every step until the barriers are aborted.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = shm.buf.cast('d')
+    try:
+        while True:
+            try:
+                start_barrier.wait()
+            except threading.BrokenBarrierError:
+                break
+
+            px = data[PX*n:(PX+1)*n].tolist()
+            py = data[PY*n:(PY+1)*n].tolist()
+            mass = data[MASS*n:(MASS+1)*n].tolist()
+            for i in range(start, end):
+                sx, sy, m = px[i], py[i], mass[i]
+                total_fx = total_fy = 0.0
+                for j in range(n):
+                    if i == j:
+                        continue
+                    dx = px[j] - sx
+                    dy = py[j] - sy
+                    d2 = dx*dx + dy*dy
+                    if d2 == 0:
+                        # Record the collision for the main process.
+                        data[5*n], data[5*n+1] = i+1, j+1
+                        continue
+                    d = math.sqrt(d2)
+                    f = gravity.G * m * mass[j] / d2
+                    total_fx += f * dx / d
+                    total_fy += f * dy / d
+                data[FX*n + i] = total_fx
+                data[FY*n + i] = total_fy
+
+            try:
+                done_barrier.wait()
+            except threading.BrokenBarrierError:
+                break
+    finally:
+        data.release()
+        shm.close()
+
+
+class ParallelForces:
+    """Computes the forces between bodies using several processes.
+
+    'num_bodies' is the number of bodies that will be passed to
+    compute(), and 'workers' is the number of processes to use
+    (by default, one per CPU).  Call close() when finished, or use
+    the engine in a 'with' statement.
+
+    If a worker process dies, compute() raises RuntimeError, and the
+    engine can't be used any more.
+
+    Methods:
+    compute(bodies) -- returns {body: (fx, fy)} like gravity.compute_forces()
+    close() -- stop the workers and free the shared memory
+    """
+    def __init__(self, num_bodies, workers=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, num_bodies))
+        n = self.num_bodies = num_bodies
+
+        self.shm = shared_memory.SharedMemory(create=True,
+                                              size=(5*n + 2) * 8)
+        self.data = self.shm.buf.cast('d')
+        self.start_barrier = multiprocessing.Barrier(workers + 1)
+        self.done_barrier = multiprocessing.Barrier(workers + 1)
+
+        # Divide the bodies into one contiguous range per worker.
+        self.processes = []
+        for k in range(workers):
+            start = n * k // workers
+            end = n * (k+1) // workers
+            p = multiprocessing.Process(
+                target=_worker, daemon=True,
+                args=(self.shm.name, n, start, end,
+                      self.start_barrier, self.done_barrier))
+            p.start()
+            self.processes.append(p)
+
+        self.monitor = threading.Thread(target=self._monitor, daemon=True)
+        self.monitor.start()
+
+    def _monitor(self):
+        # Wait for any worker to exit, which only happens on its own if
+        # it failed, and wake up the main process.
+        connection.wait([p.sentinel for p in self.processes])
+        self.start_barrier.abort()
+        self.done_barrier.abort()
+
+    def compute(self, bodies):
+        """([Body]): {Body: (fx, fy)}
+
+        Returns a dictionary giving the total force exerted upon
+        each body by all of the others.
+        """
+        n = self.num_bodies
+        if len(bodies) != n:
+            raise ValueError("Engine was created for {} bodies, not {}"
+                             .format(n, len(bodies)))
+        data = self.data
+        data[PX*n:(PX+1)*n] = array.array('d', [b.px for b in bodies])
+        data[PY*n:(PY+1)*n] = array.array('d', [b.py for b in bodies])
+        data[MASS*n:(MASS+1)*n] = array.array('d', [b.mass for b in bodies])
+        data[5*n] = data[5*n+1] = 0
+
+        try:
+            self.start_barrier.wait()
+            self.done_barrier.wait()
+        except threading.BrokenBarrierError:
+            for p in self.processes:
+                p.join(timeout=1)
+            raise RuntimeError("Force worker process stopped (exit codes {})"
+                               .format([p.exitcode for p in self.processes]))
+
+        if data[5*n]:
+            i, j = int(data[5*n]) - 1, int(data[5*n+1]) - 1
+            raise ValueError("Collision between objects %r and %r"
+                             % (bodies[i].name, bodies[j].name))
+
+        fx = data[FX*n:(FX+1)*n].tolist()
+        fy = data[FY*n:(FY+1)*n].tolist()
+        return {body: (fx[i], fy[i]) for i, body in enumerate(bodies)}
+
+    __call__ = compute
+
+    def close(self):
+        if self.shm is None:
+            return
+        # Aborting the barriers makes the workers exit.
+        self.start_barrier.abort()
+        self.done_barrier.abort()
+        for p in self.processes:
+            p.join()
+        self.monitor.join()
+        self.data.release()
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
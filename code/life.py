@@ -11,22 +11,78 @@
 #  Cursor keys :  Move the cursor around the board
 #  Space or Enter : Toggle the contents of the cursor's position
 #
+# Given --output or --generations, the board is instead filled randomly
+# and run for the given number of generations without opening a window,
+# optionally writing them to image files, e.g.
+# "life.py --output gen-{:04d}.png --generations 50".
+#
+# Given --record, the generations are recorded in a file that can be
+# read with liferecord.Recording.
+#
 
+import argparse
+import atexit
+import queue
 import sys
+import threading
 import turtle
 import random
 
+import liferecord
+import profiling
+import render
+
 CELL_SIZE = 10                  # Measured in pixels
 
+# Some well-known rules.  Conway's rule is B3/S23: a cell is Born
+# if it has 3 neighbours, and Survives if it has 2 or 3 neighbours.
+RULES = {
+    'life': 'B3/S23',
+    'highlife': 'B36/S23',
+    'daynight': 'B3678/S34678',
+    'seeds': 'B2/S',
+    'maze': 'B3/S12345',
+}
+
+def compile_rule(rule):
+    """(str): (bool, ...)
+
+    Compiles a rule in B/S notation into a table of 18 entries.
+    Entry N tells whether a dead cell with N live neighbours will be
+    alive in the next generation, and entry 9+N tells the same for
+    a live cell with N live neighbours.
+    """
+    parts = rule.upper().split('/')
+    if (len(parts) != 2 or not parts[0].startswith('B')
+        or not parts[1].startswith('S')):
+        raise ValueError("Rule {!r} is not in B/S notation, e.g. "
+                         "'B3/S23'".format(rule))
+    birth, survival = parts[0][1:], parts[1][1:]
+    for digit in birth + survival:
+        if digit not in '012345678':
+            raise ValueError("Rule {!r} has an invalid neighbour "
+                             "count {!r}".format(rule, digit))
+
+    table = [False] * 18
+    for digit in birth:
+        table[int(digit)] = True
+    for digit in survival:
+        table[9 + int(digit)] = True
+    return tuple(table)
+
+
 class LifeBoard:
     """Encapsulates a Life board
 
     Attributes:
     xsize, ysize : horizontal and vertical size of the board
     state : set containing (x,y) coordinates for live cells.
+    rule : the rule in B/S notation, e.g. 'B3/S23'
+    table : the rule compiled by compile_rule()
 
     Methods:
-    display(update_board) -- Display the state of the board on-screen.
+    display(target) -- Display the state of the board on-screen, or on
+                       the given render target.
     erase() -- clear the entire board
     makeRandom() -- fill the board randomly
     set(x,y) -- set the given cell to Live; doesn't refresh the screen
@@ -34,14 +90,16 @@ class LifeBoard:
                    versa, and refresh the screen display
 
     """
-    def __init__(self, xsize, ysize):
+    def __init__(self, xsize, ysize, rule='B3/S23'):
         """Create a new LifeBoard instance.
 
-        scr -- curses screen object to use for display
-        char -- character used to render live cells (default: '*')
+        xsize, ysize -- horizontal and vertical size of the board
+        rule -- the rule in B/S notation, or a name from RULES
         """
         self.state = set()
         self.xsize, self.ysize = xsize, ysize
+        self.rule = RULES.get(rule.lower(), rule)
+        self.table = compile_rule(self.rule)
 
     def is_legal(self, x, y):
         "Returns true if the x,y coordinates are legal for this board."
@@ -80,59 +138,105 @@ class LifeBoard:
         self.state.clear()
 
     def step(self):
-        "Compute one generation, updating the display."
-        d = set()
-        for i in range(self.xsize):
-            x_range = range( max(0, i-1), min(self.xsize, i+2) )
-            for j in range(self.ysize):
-                s = 0
-                live = ((i,j) in self.state)
-                for yp in range( max(0, j-1), min(self.ysize, j+2) ):
-                    for xp in x_range:
-                        if (xp, yp) in self.state:
-                            s += 1
-
-                # Subtract the central cell's value; it doesn't count.
-                s -= live             
-                ##print(d)
-                ##print(i, j, s, live)
-                if s == 3:
-                    # Birth
-                    d.add((i,j))
-                elif s == 2 and live: 
-                    # Survival
-                    d.add((i,j))
-                elif live:
-                    # Death
-                    pass
-
-        self.state = d
+        "Compute one generation; call display() to draw it."
+        table = self.table
+        xsize, ysize = self.xsize, self.ysize
+        state = self.state
+
+        if table[0]:
+            # Under a B0 rule, cells with no live neighbours are born,
+            # so every cell on the board has to be visited.
+            counts = dict.fromkeys(((i, j) for i in range(xsize)
+                                    for j in range(ysize)), 0)
+        else:
+            # Only cells next to a live cell, or live cells themselves,
+            # can be alive in the next generation.
+            counts = dict.fromkeys(state, 0)
+
+        # Add one to the count of each neighbour of a live cell.
+        get = counts.get
+        for (x, y) in state:
+            for key in ((x-1, y-1), (x, y-1), (x+1, y-1),
+                        (x-1, y),             (x+1, y),
+                        (x-1, y+1), (x, y+1), (x+1, y+1)):
+                counts[key] = get(key, 0) + 1
+
+        # Look up each cell's new state in the rule's table.
+        self.state = {key for key, s in counts.items()
+                      if table[s + 9*(key in state)]
+                      and 0 <= key[0] < xsize and 0 <= key[1] < ysize}
 
     #
     # Display-related methods
-    #                    
-    def draw(self, x, y):
-        "Update the cell (x,y) on the display."
-        turtle.penup()
-        key = (x, y)
-        if key in self.state:
-            turtle.setpos(x*CELL_SIZE, y*CELL_SIZE)
-            turtle.color('black')
-            turtle.pendown()
-            turtle.setheading(0)
-            turtle.begin_fill()
-            for i in range(4):
-                turtle.forward(CELL_SIZE-1)
-                turtle.left(90)
-            turtle.end_fill()
-            
-    def display(self):
-        """Draw the whole board"""
-        turtle.clear()
-        for i in range(self.xsize):
-            for j in range(self.ysize):
-                self.draw(i, j)
-        turtle.update()
+    #
+    def display(self, target=None):
+        """Draw the whole board.
+
+        The board is drawn on 'target', a render target, or on the
+        turtle screen if no target is supplied.
+        """
+        if target is None:
+            target = render.CanvasTarget(turtle.getscreen())
+        frame = render.Frame()
+        frame.clear()
+        for x, y in self.state:
+            frame.rect(x*CELL_SIZE, y*CELL_SIZE, CELL_SIZE-1, CELL_SIZE-1,
+                       'black')
+        target.flush(frame)
+
+
+class BackgroundStepper:
+    """Computes the generations of a board in a worker thread.
+
+    The worker steps its own copy of the board and puts each new
+    state into a small queue, so that the next generations are being
+    computed while the current one is drawn.  The worker reads each
+    state again while computing the following generation, so
+    next_state() returns a copy that the caller is free to change.
+
+    Methods:
+    start() -- start computing generations
+    stop(wait) -- stop the worker, waiting for it to finish if 'wait'
+                  is true
+    next_state() -- return a copy of the next generation's state, or
+                    None if it isn't ready yet
+    """
+    def __init__(self, board, maxsize=2):
+        self.board = LifeBoard(board.xsize, board.ysize, board.rule)
+        self.board.state = set(board.state)
+        self.queue = queue.Queue(maxsize)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.board.step()
+            state = self.board.state
+            # Wait for room in the queue, checking regularly
+            # whether we've been stopped.
+            while not self.stopped.is_set():
+                try:
+                    self.queue.put(state, timeout=0.05)
+                    break
+                except queue.Full:
+                    pass
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self, wait=False):
+        # Without waiting, the worker may finish the step it's computing,
+        # but its result is never used.  The worker only touches its own
+        # board and the states in the queue, never the caller's copies.
+        self.stopped.set()
+        if wait:
+            self.thread.join()
+
+    def next_state(self):
+        try:
+            return set(self.queue.get_nowait())
+        except queue.Empty:
+            return None
 
 
 def display_help_window():
@@ -162,7 +266,79 @@ def display_help_window():
         y -= line_height
     
 
+def write_generations(pattern, generations, xsize, ysize, profiler=None,
+                      rule='B3/S23', recorder=None):
+    """(str, int, int, int, Profiler, str, Recorder)
+
+    Fill a board randomly and run it for the given number of
+    generations without opening a window.  Each generation is written
+    to an image file named by 'pattern', unless 'pattern' is None, and
+    recorded by 'recorder', if supplied.
+    """
+    if profiler is None:
+        profiler = profiling.Profiler()
+    if pattern is not None:
+        target = render.ImageTarget(xsize, ysize,
+                                    world=(0, 0, xsize, ysize),
+                                    pattern=pattern)
+    board = LifeBoard(xsize // CELL_SIZE, 1 + ysize // CELL_SIZE, rule)
+    board.makeRandom()
+    for i in range(generations):
+        if recorder is not None:
+            recorder.add(board.state)
+        if pattern is not None:
+            with profiler.phase('display'):
+                board.display(target)
+        with profiler.phase('step'):
+            board.step()
+        profiler.count('generations')
+        profiler.count('live_cells', len(board.state))
+        profiler.tick()
+
+
 def main():
+    parser = argparse.ArgumentParser(
+        description="Conway's Game of Life")
+    parser.add_argument('--output', default=None, metavar='pattern',
+                        help='write generations to image files named by '
+                             'this pattern (.png, .svg, or .ps)')
+    parser.add_argument('--generations', default=None, type=int,
+                        metavar='int',
+                        help='run for this many generations without opening '
+                             'a window (default with --output: 100)')
+    parser.add_argument('--record', default=None, metavar='file',
+                        help='record the generations in a compressed file')
+    parser.add_argument('--rule', default='B3/S23', metavar='rule',
+                        help='rule in B/S notation, or one of: {}'.format(
+                            ', '.join(RULES)))
+    parser.add_argument('--profile', default=False, action='store_true',
+                        help='periodically write phase timings to stderr '
+                             'as JSON')
+    args = parser.parse_args()
+    rule = RULES.get(args.rule.lower(), args.rule)
+    try:
+        compile_rule(rule)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    profiler = profiling.Profiler(enabled=args.profile)
+    atexit.register(profiler.dump)
+
+    def open_recorder(xsize, ysize):
+        if args.record is None:
+            return None
+        recorder = liferecord.Recorder(args.record, xsize, ysize, rule)
+        atexit.register(recorder.close)
+        return recorder
+
+    if args.output is not None or args.generations is not None:
+        # Use the size of the default turtle screen.
+        xsize, ysize = 400, 300
+        recorder = open_recorder(xsize // CELL_SIZE, 1 + ysize // CELL_SIZE)
+        write_generations(args.output, args.generations or 100,
+                          xsize, ysize, profiler, rule, recorder)
+        return
+
     display_help_window()
 
     scr = turtle.Screen()
@@ -175,13 +351,25 @@ def main():
     turtle.tracer(0, 0)
     turtle.penup()
 
-    board = LifeBoard(xsize // CELL_SIZE, 1 + ysize // CELL_SIZE)
+    board = LifeBoard(xsize // CELL_SIZE, 1 + ysize // CELL_SIZE, rule)
+    recorder = open_recorder(board.xsize, board.ysize)
+
+    # In continuous mode, generations are computed by a BackgroundStepper.
+    # It has to be stopped before the board is changed; stopping doesn't
+    # wait for it, so the display isn't held up while it finishes a step.
+    stepper = None
+    def stop_stepper():
+        nonlocal stepper
+        if stepper is not None:
+            stepper.stop()
+            stepper = None
 
     # Set up mouse bindings
     def toggle(x, y):
         cell_x = x // CELL_SIZE
         cell_y = y // CELL_SIZE
         if board.is_legal(cell_x, cell_y):
+            stop_stepper()
             board.toggle(cell_x, cell_y)
             board.display()
 
@@ -190,14 +378,18 @@ def main():
 
     board.makeRandom()
     board.display()
+    if recorder is not None:
+        recorder.add(board.state)
 
     # Set up key bindings
     def erase():
+        stop_stepper()
         board.erase()
         board.display()
     turtle.onkey(erase, 'e')
 
     def makeRandom():
+        stop_stepper()
         board.makeRandom()
         board.display()
     turtle.onkey(makeRandom, 'r')
@@ -205,24 +397,58 @@ def main():
     turtle.onkey(sys.exit, 'q')
 
     # Set up keys for performing generation steps, either one-at-a-time or not.
+    # Every keypress starts a new run of perform_step() calls; a timer
+    # left over from an earlier run sees that it's stale and does nothing.
     continuous = False
+    run = 0
     def step_once():
-        nonlocal continuous
+        nonlocal continuous, run
         continuous = False
-        perform_step()
+        run += 1
+        perform_step(run)
 
     def step_continuous():
-        nonlocal continuous
+        nonlocal continuous, run
+        if continuous:
+            # Already running.
+            return
         continuous = True
-        perform_step()
-
-    def perform_step():
-        board.step()
-        board.display()
+        run += 1
+        perform_step(run)
+
+    def perform_step(current):
+        nonlocal stepper
+        if current != run:
+            return
+        if not continuous:
+            stop_stepper()
+            with profiler.phase('step'):
+                board.step()
+        else:
+            # Take the next generation from the background stepper,
+            # starting one if necessary.
+            if stepper is None:
+                stepper = BackgroundStepper(board)
+                stepper.start()
+            state = stepper.next_state()
+            if state is None:
+                # The generation isn't ready yet, so check again soon.
+                profiler.count('waits')
+                turtle.ontimer(lambda: perform_step(current), 1)
+                return
+            board.state = state
+
+        if recorder is not None:
+            recorder.add(board.state)
+        with profiler.phase('display'):
+            board.display()
+        profiler.count('generations')
+        profiler.count('live_cells', len(board.state))
+        profiler.tick()
         # In continuous mode, we set a timer to display another generation
         # after 25 millisenconds.
         if continuous:
-            turtle.ontimer(perform_step, 25)
+            turtle.ontimer(lambda: perform_step(current), 25)
 
     turtle.onkey(step_once, 's')
     turtle.onkey(step_continuous, 'c')
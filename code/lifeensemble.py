@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+# lifeensemble.py -- Step many independent Life boards at once.
+#
+# Stepping thousands of small LifeBoard instances one at a time spends
+# most of its time in the interpreter rather than on the boards.  A
+# LifeEnsemble instead packs all of its boards into the bits of a single
+# Python integer and computes a generation for every board with a few
+# dozen whole-integer operations, each of which runs as a C loop.
+#
+# Layout: each row of a board occupies xsize+1 bits, the extra bit
+# being an always-empty padding column, and each board occupies
+# ysize+1 rows, the extra row being an always-empty padding row.
+# Each board's bits are then rounded up to a whole number of bytes,
+# so that the integer can be converted to bytes once and sliced into
+# boards.  The boards are stacked one after another, so cell (x, y)
+# of board k is bit number k*board_bits + y*(xsize+1) + x.  Shifting the
+# integer by 1 or by a row width moves every cell to a neighbouring
+# position; anything shifted off the edge of a board lands in the
+# padding, which is cleared after every step, so the boards never
+# affect each other.
+#
+# The eight shifted copies are added together using bitwise adders,
+# giving the neighbour count of every cell as four bit planes, and the
+# rule is applied by comparing the counts with the rule's numbers.
+#
+
+import random
+
+import life
+
+class LifeEnsemble:
+    """A set of same-sized Life boards stepped together.
+
+    Attributes:
+    count : the number of boards
+    xsize, ysize : horizontal and vertical size of every board
+    rule : the rule in B/S notation
+    bits : integer holding the cells of all the boards
+
+    Methods:
+    from_boards(boards) -- class method creating an ensemble from LifeBoards
+    set_state(k, state) -- set the live cells of board k
+    get_state(k) -- return the set of live cells of board k
+    to_boards() -- return a list of LifeBoard instances
+    randomize(density, rng) -- fill every board randomly
+    step() -- compute one generation of every board
+    populations() -- return the number of live cells on each board
+    extinct() -- return a list telling which boards have no live cells
+    """
+    def __init__(self, count, xsize, ysize, rule='B3/S23'):
+        self.count = count
+        self.xsize, self.ysize = xsize, ysize
+        self.rule = life.RULES.get(rule.lower(), rule)
+        table = life.compile_rule(self.rule)
+        self.birth = [n for n in range(9) if table[n]]
+        self.survival = [n for n in range(9) if table[9+n]]
+
+        self.row_width = xsize + 1
+        self.board_bytes = (self.row_width * (ysize + 1) + 7) // 8
+        self.board_bits = 8 * self.board_bytes
+        self.full = (1 << (self.board_bits * count)) - 1
+
+        # Mask of the bits that hold real cells, not padding.
+        row = (1 << xsize) - 1
+        board = 0
+        for y in range(ysize):
+            board |= row << (y * self.row_width)
+        self.board_mask = board
+        self.valid = self._repeat(board)
+        self.bits = 0
+
+    def _repeat(self, pattern):
+        "Returns 'pattern' repeated once for each board."
+        return self._join([pattern] * self.count)
+
+    def _join(self, boards):
+        "Returns the integer holding the given list of boards."
+        size = self.board_bytes
+        data = b''.join(board.to_bytes(size, 'little') for board in boards)
+        return int.from_bytes(data, 'little')
+
+    def _split(self):
+        "Returns the list of boards held in self.bits, as integers."
+        size = self.board_bytes
+        data = self.bits.to_bytes(size * self.count, 'little')
+        return [int.from_bytes(data[k*size:(k+1)*size], 'little')
+                for k in range(self.count)]
+
+    def _board_bits(self, state):
+        "Returns the integer holding the cells in 'state'."
+        board = 0
+        for (x, y) in state:
+            if not (0 <= x < self.xsize and 0 <= y < self.ysize):
+                raise ValueError("Coordinates {}, {} out of range "
+                                 "0..{}, 0..{}".format(x, y, self.xsize,
+                                                       self.ysize))
+            board |= 1 << (y * self.row_width + x)
+        return board
+
+    def _board_state(self, board):
+        "Returns the set of cells held in the integer 'board'."
+        state = set()
+        width = self.row_width
+        while board:
+            low = board & -board
+            n = low.bit_length() - 1
+            state.add((n % width, n // width))
+            board ^= low
+        return state
+
+    @classmethod
+    def from_boards(cls, boards):
+        """([LifeBoard]): LifeEnsemble
+
+        Creates an ensemble holding copies of the given boards, which
+        must all have the same size and rule.
+        """
+        first = boards[0]
+        for board in boards:
+            if ((board.xsize, board.ysize, board.rule) !=
+                (first.xsize, first.ysize, first.rule)):
+                raise ValueError("Boards must have the same size and rule")
+        ensemble = cls(len(boards), first.xsize, first.ysize, first.rule)
+        ensemble.bits = ensemble._join([ensemble._board_bits(board.state)
+                                        for board in boards])
+        return ensemble
+
+    def set_state(self, k, state):
+        base = k * self.board_bits
+        self.bits &= ~(self.board_mask << base)
+        self.bits |= self._board_bits(state) << base
+
+    def get_state(self, k):
+        board = (self.bits >> (k * self.board_bits)) & self.board_mask
+        return self._board_state(board)
+
+    def to_boards(self):
+        boards = []
+        for bits in self._split():
+            board = life.LifeBoard(self.xsize, self.ysize, self.rule)
+            board.state = self._board_state(bits)
+            boards.append(board)
+        return boards
+
+    def randomize(self, density=0.5, rng=random):
+        """Fill every board randomly, each cell being live with 'density'.
+
+        The density is rounded to a multiple of 1/65536.
+        """
+        # Build the bits from random words: working from the lowest bit
+        # of the density's binary fraction upwards, OR-ing in a random
+        # word for a 1 bit and AND-ing for a 0 bit leaves each bit set
+        # with probability equal to the fraction.
+        size = self.board_bits * self.count
+        fraction = round(density * 65536)
+        if fraction >= 65536:
+            self.bits = self.valid
+            return
+        bits = 0
+        for i in range(16):
+            word = rng.getrandbits(size) if size else 0
+            if (fraction >> i) & 1:
+                bits |= word
+            else:
+                bits &= word
+        self.bits = bits & self.valid
+
+    def step(self):
+        "Compute one generation of every board."
+        live = self.bits
+        full = self.full
+        w = self.row_width
+
+        # Add up the eight neighbours of every cell, keeping the
+        # count as four bit planes.
+        counts = [0, 0, 0, 0]
+        for shift in (w - 1, w, w + 1, 1):
+            for plane in (live << shift, live >> shift):
+                carry = plane & full
+                for i in range(4):
+                    counts[i], carry = counts[i] ^ carry, counts[i] & carry
+                    if not carry:
+                        break
+
+        def equals(n):
+            # Mask of the cells whose neighbour count is n.
+            mask = full
+            for i in range(4):
+                if (n >> i) & 1:
+                    mask &= counts[i]
+                else:
+                    mask &= counts[i] ^ full
+            return mask
+
+        born = survive = 0
+        for n in self.birth:
+            born |= equals(n)
+        for n in self.survival:
+            survive |= equals(n)
+        self.bits = ((born & (live ^ full)) | (survive & live)) & self.valid
+
+    def populations(self):
+        return [board.bit_count() for board in self._split()]
+
+    def extinct(self):
+        return [board == 0 for board in self._split()]
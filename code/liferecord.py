@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+# liferecord.py -- Compressed, seekable recordings of Life runs.
+#
+# A recording stores the generations of a Life board in blocks.  Each
+# block begins with a keyframe listing all of the live cells, followed
+# by up to 'interval'-1 generations that each list only the cells born
+# and the cells that died since the previous generation.  Every block
+# is compressed separately with zlib, and an index at the end of the
+# file gives the position of each block, so reaching any generation
+# only requires decoding the block containing it.
+#
+# File layout:
+#   MAGIC
+#   length of the header, as a 4-byte big-endian integer
+#   header, as JSON: board size, rule, and interval
+#   blocks, one after another, each being the length of the compressed
+#     data as a 4-byte big-endian integer followed by the data
+#   index, as JSON: number of generations, and the offset and length of
+#                   the compressed data of each block
+#   offset of the index, as an 8-byte big-endian integer
+#
+# The index is only written when the recording is closed.  If the
+# program recording a run is killed, the blocks written so far can
+# still be found by following their lengths from the start of the file;
+# Recording does this when the index is missing or damaged.
+#
+# Within a block, a list of cells is written as the number of cells
+# followed by the gaps between their sorted cell numbers (y*xsize + x),
+# all as variable-length integers.
+#
+
+import json
+import struct
+import zlib
+
+MAGIC = b'LIFEREC1'
+
+def _write_varint(out, n):
+    "Append the integer n to the bytearray 'out', 7 bits per byte."
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _read_varint(data, pos):
+    "Returns the integer starting at data[pos], and the following position."
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+def _write_cells(out, numbers):
+    _write_varint(out, len(numbers))
+    previous = 0
+    for n in sorted(numbers):
+        _write_varint(out, n - previous)
+        previous = n
+
+def _read_cells(data, pos):
+    count, pos = _read_varint(data, pos)
+    numbers = []
+    n = 0
+    for i in range(count):
+        gap, pos = _read_varint(data, pos)
+        n += gap
+        numbers.append(n)
+    return numbers, pos
+
+def _decode_block(data):
+    "Returns the list of states, as sets of cell numbers, in a block."
+    numbers, pos = _read_cells(data, 0)
+    current = set(numbers)
+    states = [current]
+    while pos < len(data):
+        born, pos = _read_cells(data, pos)
+        died, pos = _read_cells(data, pos)
+        current = current.difference(died)
+        current.update(born)
+        states.append(current)
+    return states
+
+
+class Recorder:
+    """Writes the generations of a Life board to a recording file.
+
+    Methods:
+    add(state) -- record the next generation, given its set of live cells
+    close() -- finish writing the recording
+    """
+    def __init__(self, filename, xsize, ysize, rule='B3/S23', interval=100):
+        self.f = open(filename, 'wb')
+        self.xsize, self.ysize = xsize, ysize
+        self.rule = rule
+        self.interval = interval
+        header = json.dumps({
+            'xsize': xsize, 'ysize': ysize, 'rule': rule,
+            'interval': interval,
+        }).encode('ascii')
+        self.f.write(MAGIC)
+        self.f.write(struct.pack('>I', len(header)))
+        self.f.write(header)
+        self.generations = 0
+        self.blocks = []
+        self.block = bytearray()
+        self.previous = None
+
+    def add(self, state):
+        xsize = self.xsize
+        numbers = {y*xsize + x for (x, y) in state}
+        if self.generations % self.interval == 0:
+            # Start a new block with a keyframe.
+            self._flush_block()
+            _write_cells(self.block, numbers)
+        else:
+            _write_cells(self.block, numbers - self.previous)   # Born
+            _write_cells(self.block, self.previous - numbers)   # Died
+        self.previous = numbers
+        self.generations += 1
+
+    def _flush_block(self):
+        if self.block:
+            data = zlib.compress(bytes(self.block))
+            self.f.write(struct.pack('>I', len(data)))
+            self.blocks.append((self.f.tell(), len(data)))
+            self.f.write(data)
+            # Make the block readable even if the program is killed.
+            self.f.flush()
+            self.block = bytearray()
+
+    def close(self):
+        if self.f is None:
+            return
+        self._flush_block()
+        index = {'generations': self.generations, 'blocks': self.blocks}
+        offset = self.f.tell()
+        self.f.write(json.dumps(index).encode('ascii'))
+        self.f.write(struct.pack('>Q', offset))
+        self.f.close()
+        self.f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """Reads a recording written by a Recorder.
+
+    A recording that was never closed has no index.  It can still be
+    read, but only the blocks that were completely written are found,
+    so the last few generations of the run may be missing.
+
+    Attributes:
+    xsize, ysize : size of the board
+    rule : the rule used for the run
+    generations : the number of generations recorded
+    complete : false if the index was missing and had to be rebuilt
+
+    Methods:
+    state(generation) -- return the set of live cells in a generation
+    replay(start) -- iterate over the states from generation 'start' on
+    close() -- close the file
+    """
+    def __init__(self, filename):
+        self.f = open(filename, 'rb')
+        try:
+            if self.f.read(len(MAGIC)) != MAGIC:
+                raise ValueError
+            length, = struct.unpack('>I', self.f.read(4))
+            header = json.loads(self.f.read(length).decode('ascii'))
+        except (ValueError, struct.error):
+            self.f.close()
+            raise ValueError("{!r} is not a Life recording".format(filename))
+
+        self.xsize, self.ysize = header['xsize'], header['ysize']
+        self.rule = header['rule']
+        self.interval = header['interval']
+        self._cache = (None, None)
+
+        start = self.f.tell()
+        index = self._read_index(start)
+        self.complete = index is not None
+        if index is None:
+            index = self._rebuild_index(start)
+        self.generations = index['generations']
+        self.blocks = index['blocks']
+
+    def _read_index(self, start):
+        "Returns the index at the end of the file, or None if it's damaged."
+        end = self.f.seek(0, 2) - 8
+        if end < start:
+            return None
+        self.f.seek(end)
+        offset, = struct.unpack('>Q', self.f.read(8))
+        if not start <= offset < end:
+            return None
+        self.f.seek(offset)
+        try:
+            index = json.loads(self.f.read(end - offset).decode('ascii'))
+        except ValueError:
+            return None
+        if not isinstance(index, dict) or 'blocks' not in index:
+            return None
+        return index
+
+    def _rebuild_index(self, start):
+        """Returns an index listing the complete blocks found by following
+        the block lengths from 'start'."""
+        blocks = []
+        generations = 0
+        end = self.f.seek(0, 2)
+        pos = start
+        while pos + 4 <= end:
+            self.f.seek(pos)
+            length, = struct.unpack('>I', self.f.read(4))
+            if pos + 4 + length > end:
+                break
+            try:
+                states = _decode_block(zlib.decompress(self.f.read(length)))
+            except (zlib.error, IndexError):
+                break
+            blocks.append((pos + 4, length))
+            generations += len(states)
+            pos += 4 + length
+            if len(states) < self.interval:
+                # Only the last block can be partly filled.
+                break
+        return {'generations': generations, 'blocks': blocks}
+
+    def _block_states(self, block_num):
+        "Returns the list of states, as sets of cell numbers, in a block."
+        if self._cache[0] == block_num:
+            return self._cache[1]
+
+        offset, length = self.blocks[block_num]
+        self.f.seek(offset)
+        states = _decode_block(zlib.decompress(self.f.read(length)))
+        self._cache = (block_num, states)
+        return states
+
+    def _to_cells(self, numbers):
+        xsize = self.xsize
+        return {(n % xsize, n // xsize) for n in numbers}
+
+    def state(self, generation):
+        if not 0 <= generation < self.generations:
+            raise IndexError("Generation {} out of range 0..{}".format(
+                generation, self.generations - 1))
+        block_num, i = divmod(generation, self.interval)
+        return self._to_cells(self._block_states(block_num)[i])
+
+    def replay(self, start=0):
+        for generation in range(start, self.generations):
+            yield self.state(generation)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
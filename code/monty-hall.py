@@ -4,7 +4,8 @@
 
 """
 
-import argparse, random
+import argparse, functools, math, random, sys
+from fractions import Fraction
 
 def simulate(num_doors, switch, verbose):
     """(int, bool): bool
@@ -70,6 +71,202 @@ def simulate(num_doors, switch, verbose):
     return won
 
 
+def play_game(num_doors):
+    """(int): (int, int, [int])
+
+    Set up a single game without any output.  Returns the door hiding
+    the prize, the contestant's first choice, and the list of the two
+    doors left closed after the host has opened all the others.
+    """
+    winning_door = random.randint(0, num_doors-1)
+    choice = random.randint(0, num_doors-1)
+
+    # The host leaves the contestant's door closed, along with the
+    # prize door.  If the contestant already picked the prize, the
+    # host leaves some other random door closed.
+    if choice != winning_door:
+        other = winning_door
+    else:
+        other = random.randint(0, num_doors-2)
+        if other >= choice:
+            other += 1
+
+    closed_doors = sorted([choice, other])
+    return winning_door, choice, closed_doors
+
+
+# Contestant strategies.  A strategy is a function that takes the
+# contestant's first choice and the two closed doors, and returns
+# the door the contestant finally opens.
+#
+# exact_probabilities() needs to know how a strategy behaves in every
+# possible game.  A strategy that makes random decisions must describe
+# itself with a 'switch_probability' attribute giving the chance that it
+# switches doors, as a Fraction; a strategy without the attribute must
+# be deterministic, so that calling it once per game gives its answer.
+
+def never_switch(choice, closed_doors):
+    "Always stay with the first choice."
+    return choice
+
+def always_switch(choice, closed_doors):
+    "Always switch to the other closed door."
+    if closed_doors[0] == choice:
+        return closed_doors[1]
+    return closed_doors[0]
+
+def random_switch(choice, closed_doors):
+    "Flip a coin to decide whether to switch."
+    return random.choice(closed_doors)
+
+never_switch.switch_probability = Fraction(0)
+always_switch.switch_probability = Fraction(1)
+random_switch.switch_probability = Fraction(1, 2)
+
+STRATEGIES = {
+    'never': never_switch,
+    'always': always_switch,
+    'random': random_switch,
+}
+
+
+def compare_strategies(num_doors, trials, strategies):
+    """(int, int, {str: function}): ({str: int}, {(str, str): (float, float)})
+
+    Play 'trials' games, letting every strategy in 'strategies' play
+    each game against the same prize door, first choice and set of
+    opened doors.  Returns a dictionary mapping each strategy name to
+    its number of wins, and a dictionary mapping each pair of names
+    (a, b) to the mean of the paired per-game difference in wins
+    (a minus b) and the standard error of that mean.
+    """
+    names = list(strategies)
+    pairs = [(a, b) for i, a in enumerate(names) for b in names[i+1:]]
+    wins = dict.fromkeys(names, 0)
+    diff_sum = dict.fromkeys(pairs, 0)
+    diff_sumsq = dict.fromkeys(pairs, 0)
+
+    for i in range(trials):
+        winning_door, choice, closed_doors = play_game(num_doors)
+        won = {}
+        for name in names:
+            door = strategies[name](choice, closed_doors)
+            won[name] = (door == winning_door)
+            wins[name] += won[name]
+
+        for a, b in pairs:
+            d = won[a] - won[b]
+            diff_sum[a, b] += d
+            diff_sumsq[a, b] += d * d
+
+    diffs = {}
+    for pair in pairs:
+        mean = diff_sum[pair] / trials
+        if trials > 1:
+            variance = (diff_sumsq[pair] - trials * mean**2) / (trials - 1)
+            stderr = math.sqrt(max(variance, 0) / trials)
+        else:
+            stderr = float('nan')
+        diffs[pair] = (mean, stderr)
+
+    return wins, diffs
+
+
+@functools.lru_cache(maxsize=None)
+def game_tree(num_doors):
+    """(int): ((Fraction, int, int, (int, int)), ...)
+
+    Enumerates every possible game: each combination of prize door,
+    first choice, and the door the host leaves closed.  Returns a tuple
+    of (probability, winning_door, choice, closed_doors) entries whose
+    probabilities add up to 1.  Results are cached for each door count.
+    """
+    leaves = []
+    p_start = Fraction(1, num_doors**2)
+    for winning_door in range(num_doors):
+        for choice in range(num_doors):
+            if choice != winning_door:
+                # The host must leave the prize door closed.
+                others = [winning_door]
+            else:
+                # The host picks one of the other doors at random.
+                others = [door for door in range(num_doors)
+                          if door != choice]
+            p = p_start / len(others)
+            for other in others:
+                closed_doors = tuple(sorted([choice, other]))
+                leaves.append((p, winning_door, choice, closed_doors))
+    return tuple(leaves)
+
+
+@functools.lru_cache(maxsize=None)
+def exact_probability(num_doors, strategy):
+    """(int, function): Fraction
+
+    Returns the exact probability that 'strategy' wins, computed by
+    enumerating the game tree.  Results are cached for each door count
+    and strategy.
+    """
+    q = getattr(strategy, 'switch_probability', None)
+    total = Fraction(0)
+    for p, winning_door, choice, closed_doors in game_tree(num_doors):
+        if q is None:
+            if strategy(choice, closed_doors) == winning_door:
+                total += p
+        else:
+            other = always_switch(choice, closed_doors)
+            total += p * ((1 - q) * (choice == winning_door) +
+                          q * (other == winning_door))
+    return total
+
+
+def exact_probabilities(num_doors, strategies=STRATEGIES):
+    """(int, {str: function}): {str: Fraction}
+
+    Returns a new dictionary mapping the name of each strategy in
+    'strategies' to its exact probability of winning.
+    """
+    return {name: exact_probability(num_doors, strategy)
+            for name, strategy in strategies.items()}
+
+
+def validate(num_doors, trials, tolerance=4, exact=None):
+    """(int, int, float, {str: Fraction}): bool
+
+    Checks both simulation engines against the exact probabilities of
+    the strategies in STRATEGIES, printing one line per check.  'exact'
+    maps each strategy name to its probability, and is computed by
+    exact_probabilities() if not supplied.  A simulated winning rate
+    passes if it lies within 'tolerance' standard errors of the exact
+    value.  Returns True if every check passed.
+    """
+    if exact is None:
+        exact = exact_probabilities(num_doors)
+
+    # Run the original simulate() engine for both strategies...
+    simulated = []
+    for name, switch in (('never', False), ('always', True)):
+        wins = sum(simulate(num_doors, switch, verbose=False)
+                   for i in range(trials))
+        simulated.append(('simulate', name, wins))
+
+    # ...and the shared-game engine for all strategies.
+    wins, diffs = compare_strategies(num_doors, trials, STRATEGIES)
+    for name in STRATEGIES:
+        simulated.append(('compare_strategies', name, wins[name]))
+
+    all_ok = True
+    for engine, name, wins in simulated:
+        p = exact[name]
+        stderr = math.sqrt(p * (1 - p) / trials)
+        rate = wins / trials
+        ok = abs(rate - p) <= tolerance * stderr
+        all_ok = all_ok and ok
+        print('{0:<18} {1:>6}: {2:.4f} vs. exact {3:.4f} ... {4}'.format(
+                engine, name, rate, float(p), 'ok' if ok else 'FAILED'))
+    return all_ok
+
+
 def main():
     # Get command-line arguments
     parser = argparse.ArgumentParser(
@@ -80,10 +277,53 @@ def main():
                         help='number of trials to perform')
     parser.add_argument('--verbose', default=False, action='store_true',
                         help='display the results of each trial')
+    parser.add_argument('--compare', default=None, metavar='names',
+                        help='play the strategies in this comma-separated '
+                             'list ({}) against the same games'.format(
+                                 ','.join(STRATEGIES)))
+    parser.add_argument('--exact', default=False, action='store_true',
+                        help='compute the exact winning probabilities '
+                             'instead of simulating')
+    parser.add_argument('--validate', default=False, action='store_true',
+                        help='check the simulations against the exact '
+                             'probabilities')
     args = parser.parse_args()
 
+    if args.exact:
+        exact = exact_probabilities(args.doors)
+        for name in STRATEGIES:
+            print('{0:>8} wins with probability {1} ({2:.4f}%)'.format(
+                    name, exact[name], float(exact[name]) * 100))
+        return
+
+    if args.validate:
+        print('Validating with {} trials...'.format(args.trials))
+        if not validate(args.doors, args.trials):
+            sys.exit(1)
+        return
+
+    if args.compare is not None:
+        names = args.compare.split(',')
+        for name in names:
+            if name not in STRATEGIES:
+                parser.error('unknown strategy {!r}'.format(name))
+
     print('Simulating {} trials...'.format(args.trials))
 
+    if args.compare is not None:
+        strategies = {name: STRATEGIES[name] for name in names}
+        wins, diffs = compare_strategies(args.doors, args.trials, strategies)
+
+        for name in names:
+            print('{0:>8} won {1:5} times out of {2} '
+                  '({3}% of the time)'.format(
+                    name, wins[name], args.trials,
+                    (wins[name] / args.trials * 100 ) ))
+        for (a, b), (mean, stderr) in diffs.items():
+            print('{0:>8} - {1:<8} {2:+.4f} per game '
+                  '(standard error {3:.4f})'.format(a, b, mean, stderr))
+        return
+
     # Carry out the trials
     winning_non_switchers = 0
     winning_switchers = 0
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+# profiling.py -- Phase timers and counters for the simulation loops.
+#
+# A Profiler measures how long each named phase of a loop takes:
+#
+#     profiler = profiling.Profiler(enabled=True)
+#     while True:
+#         with profiler.phase('step'):
+#             board.step()
+#         profiler.count('generations')
+#         profiler.tick()
+#
+# Every 'interval' seconds, tick() writes one line of JSON to the
+# output file giving, for each phase, the number of calls, the total
+# time, and a histogram of call durations.  Durations are grouped into
+# power-of-two buckets of microseconds; the histogram maps the upper
+# bound of each bucket to the number of calls that fell within it.
+#
+# A disabled profiler does no timing at all, so the 'with' statements
+# can be left in place and cost very little.  An enabled profiler may be
+# shared between threads: its statistics are guarded by a lock, so one
+# thread can dump them while another is still recording.
+#
+
+import json
+import sys
+import threading
+import time
+
+
+class _NullPhase:
+    "Context manager that does nothing, used when profiling is disabled."
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    "Context manager that times one execution of a phase."
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class PhaseStats:
+    """Accumulated timings for one phase.
+
+    Attributes:
+    calls : number of times the phase was executed
+    total : total time spent in the phase, in seconds
+    histogram : dictionary mapping a bucket's upper bound in
+                microseconds to the number of calls in that bucket
+    """
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.histogram = {}
+
+    def add(self, duration):
+        self.calls += 1
+        self.total += duration
+        bucket = 1 << max(0, int(duration * 1e6)).bit_length()
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+
+class Profiler:
+    """Collects timings for named phases and counts of named events.
+
+    Methods:
+    phase(name) -- return a context manager timing the phase 'name'
+    count(name, n) -- add 'n' to the counter 'name'
+    tick() -- write a report if 'interval' seconds have passed
+    report() -- return the statistics gathered since the last dump
+    dump() -- write the statistics and start collecting afresh
+    """
+    def __init__(self, enabled=False, interval=5.0, outfile=None):
+        self.enabled = enabled
+        self.interval = interval
+        self.outfile = outfile
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.phases = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def _add(self, name, duration):
+        with self.lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+            stats.add(duration)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def tick(self):
+        if (self.enabled and
+            time.perf_counter() - self.started >= self.interval):
+            self.dump()
+
+    def report(self):
+        """(): dict
+
+        Returns the statistics gathered since the last dump as a
+        dictionary suitable for converting to JSON.
+        """
+        with self.lock:
+            return self._report()
+
+    def _report(self):
+        phases = {}
+        for name, stats in self.phases.items():
+            phases[name] = {
+                'calls': stats.calls,
+                'total': stats.total,
+                'histogram_us': {str(bucket): n for bucket, n in
+                                 sorted(stats.histogram.items())},
+            }
+        return {
+            'elapsed': time.perf_counter() - self.started,
+            'phases': phases,
+            'counters': dict(self.counters),
+        }
+
+    def dump(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            report = self._report()
+            self._reset()
+        outfile = self.outfile or sys.stderr
+        print(json.dumps(report, sort_keys=True), file=outfile)
+        outfile.flush()
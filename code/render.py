@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+
+# render.py -- Batched drawing for the turtle-based examples.
+#
+# Moving a turtle redraws the Tk canvas after every segment, which
+# makes animations with many shapes slow.  Instead, a program can record
+# a frame's drawing operations in a Frame object and hand the whole
+# frame to a target, which draws it in a single batch.  Two targets are
+# available: CanvasTarget draws on a live turtle screen, and ImageTarget
+# draws offscreen and writes PNG, SVG or PostScript files, so it works
+# on machines without a display.
+#
+# Colours must be given as '#rrggbb' strings or as one of the names in
+# the COLORS dictionary.
+#
+
+import math
+import struct
+import zlib
+
+# RGB values for the colour names understood by ImageTarget.
+COLORS = {
+    'black': (0, 0, 0),
+    'white': (255, 255, 255),
+    'gray': (128, 128, 128),
+    'grey': (128, 128, 128),
+    'red': (255, 0, 0),
+    'green': (0, 128, 0),
+    'blue': (0, 0, 255),
+    'yellow': (255, 255, 0),
+    'orange': (255, 165, 0),
+    'violet': (238, 130, 238),
+    'purple': (128, 0, 128),
+    'brown': (165, 42, 42),
+    'cyan': (0, 255, 255),
+    'magenta': (255, 0, 255),
+    'pink': (255, 192, 203),
+}
+
+def color_to_rgb(color):
+    """(str): (int, int, int)
+
+    Converts a colour name or '#rrggbb' string to an RGB tuple.
+    """
+    if color.startswith('#') and len(color) == 7:
+        return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+    try:
+        return COLORS[color.lower()]
+    except KeyError:
+        raise ValueError("Unknown colour {!r}".format(color))
+
+
+class Frame:
+    """Records the drawing operations for one frame.
+
+    Attributes:
+    ops : list of recorded operations, as tuples whose first
+          element is the operation name.
+
+    Methods:
+    clear() -- erase everything drawn by earlier frames
+    line(points, color, width) -- draw a line through a list of (x,y) points
+    rect(x, y, width, height, color) -- fill a rectangle whose lower-left
+                                        corner is at (x,y)
+    dot(x, y, size, color) -- fill a circle of diameter 'size' centred on (x,y)
+
+    """
+    def __init__(self):
+        self.ops = []
+
+    def clear(self):
+        self.ops.append(('clear',))
+
+    def line(self, points, color='black', width=1):
+        if len(points) >= 2:
+            self.ops.append(('line', list(points), color, width))
+
+    def rect(self, x, y, width, height, color='black'):
+        self.ops.append(('rect', x, y, width, height, color))
+
+    def dot(self, x, y, size, color='black'):
+        self.ops.append(('dot', x, y, size, color))
+
+
+class CanvasTarget:
+    """Draws frames on the Tk canvas of a turtle screen.
+
+    Each frame is drawn with one canvas call per operation and a
+    single screen update, however many operations it contains.
+    """
+    TAG = 'render'
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.canvas = screen.getcanvas()
+
+    def _coords(self, x, y):
+        # Convert world coordinates to canvas coordinates the same way
+        # the turtle module does.
+        return x * self.screen.xscale, -y * self.screen.yscale
+
+    def flush(self, frame):
+        "Draw all of the operations recorded in 'frame'."
+        canvas = self.canvas
+        for op in frame.ops:
+            kind = op[0]
+            if kind == 'clear':
+                canvas.delete(self.TAG)
+            elif kind == 'line':
+                points, color, width = op[1:]
+                coords = []
+                for x, y in points:
+                    coords.extend(self._coords(x, y))
+                canvas.create_line(coords, fill=color, width=width,
+                                   capstyle='round', tags=self.TAG)
+            elif kind == 'rect':
+                x, y, width, height, color = op[1:]
+                x0, y0 = self._coords(x, y)
+                x1, y1 = self._coords(x + width, y + height)
+                canvas.create_rectangle(x0, y0, x1, y1, fill=color,
+                                        outline='', tags=self.TAG)
+            elif kind == 'dot':
+                x, y, size, color = op[1:]
+                cx, cy = self._coords(x, y)
+                r = size / 2
+                canvas.create_oval(cx - r, cy - r, cx + r, cy + r,
+                                   fill=color, outline='', tags=self.TAG)
+        self.screen.update()
+
+
+class ImageTarget:
+    """Draws frames offscreen and saves them as image files.
+
+    'width' and 'height' give the image size in pixels, and 'world'
+    gives the (llx, lly, urx, ury) world coordinates of the lower-left
+    and upper-right corners, as for turtle.setworldcoordinates().  By
+    default the origin is in the centre, as on a turtle screen.
+
+    If 'pattern' is supplied, every flushed frame is saved to the file
+    named by pattern.format(frame_number), e.g. 'frame-{:04d}.png'.
+    The file type is chosen by the extension: .png, .svg, or .ps/.eps.
+
+    Methods:
+    flush(frame) -- add a frame's operations to the picture
+    save(filename) -- write the current picture to a file
+    """
+    def __init__(self, width, height, world=None, pattern=None,
+                 background='white'):
+        self.width, self.height = width, height
+        if world is None:
+            world = (-width / 2, -height / 2, width / 2, height / 2)
+        self.world = world
+        self.pattern = pattern
+        self.background = background
+        self.frame_number = 0
+        self.ops = []
+
+    def flush(self, frame):
+        "Add the operations recorded in 'frame' to the picture."
+        for op in frame.ops:
+            if op[0] == 'clear':
+                self.ops = []
+            else:
+                self.ops.append(op)
+        if self.pattern is not None:
+            self.save(self.pattern.format(self.frame_number))
+        self.frame_number += 1
+
+    def save(self, filename):
+        "Write the current picture to a PNG, SVG or PostScript file."
+        ext = filename.rsplit('.', 1)[-1].lower()
+        if ext == 'png':
+            data = self.to_png()
+        elif ext == 'svg':
+            data = self.to_svg().encode('utf-8')
+        elif ext in ('ps', 'eps'):
+            data = self.to_postscript().encode('ascii')
+        else:
+            raise ValueError("Unknown image format for {!r}".format(filename))
+        with open(filename, 'wb') as f:
+            f.write(data)
+
+    def _scale(self):
+        llx, lly, urx, ury = self.world
+        return self.width / (urx - llx), self.height / (ury - lly)
+
+    def _pixel(self, x, y):
+        # Convert world coordinates to image coordinates, with the
+        # origin in the top-left corner.
+        llx, lly, urx, ury = self.world
+        sx, sy = self._scale()
+        return (x - llx) * sx, (ury - y) * sy
+
+    #
+    # SVG output
+    #
+    def to_svg(self):
+        "Returns the picture as an SVG document."
+        sx, sy = self._scale()
+        lines = ['<svg xmlns="http://www.w3.org/2000/svg" '
+                 'width="{}" height="{}">'.format(self.width, self.height),
+                 '<rect width="100%" height="100%" fill="{}"/>'.format(
+                     self.background)]
+        for op in self.ops:
+            kind = op[0]
+            if kind == 'line':
+                points, color, width = op[1:]
+                coords = ' '.join('{:.2f},{:.2f}'.format(*self._pixel(x, y))
+                                  for x, y in points)
+                lines.append('<polyline points="{}" fill="none" stroke="{}" '
+                             'stroke-width="{}" stroke-linecap="round"/>'
+                             .format(coords, color, width))
+            elif kind == 'rect':
+                x, y, width, height, color = op[1:]
+                px, py = self._pixel(x, y + height)
+                lines.append('<rect x="{:.2f}" y="{:.2f}" width="{:.2f}" '
+                             'height="{:.2f}" fill="{}"/>'.format(
+                                 px, py, width * sx, height * sy, color))
+            elif kind == 'dot':
+                x, y, size, color = op[1:]
+                px, py = self._pixel(x, y)
+                lines.append('<circle cx="{:.2f}" cy="{:.2f}" r="{}" '
+                             'fill="{}"/>'.format(px, py, size / 2, color))
+        lines.append('</svg>')
+        return '\n'.join(lines) + '\n'
+
+    #
+    # PostScript output
+    #
+    def to_postscript(self):
+        "Returns the picture as an Encapsulated PostScript document."
+        def setcolor(color):
+            r, g, b = color_to_rgb(color)
+            return '{:.3f} {:.3f} {:.3f} setrgbcolor'.format(
+                r / 255, g / 255, b / 255)
+
+        def point(x, y):
+            # PostScript's origin is at the bottom-left.
+            px, py = self._pixel(x, y)
+            return '{:.2f} {:.2f}'.format(px, self.height - py)
+
+        sx, sy = self._scale()
+        lines = ['%!PS-Adobe-3.0 EPSF-3.0',
+                 '%%BoundingBox: 0 0 {} {}'.format(self.width, self.height),
+                 setcolor(self.background),
+                 '0 0 {} {} rectfill'.format(self.width, self.height),
+                 '1 setlinecap 1 setlinejoin']
+        for op in self.ops:
+            kind = op[0]
+            if kind == 'line':
+                points, color, width = op[1:]
+                lines.append('{} {} setlinewidth newpath'.format(
+                    setcolor(color), width))
+                lines.append(point(*points[0]) + ' moveto')
+                for x, y in points[1:]:
+                    lines.append(point(x, y) + ' lineto')
+                lines.append('stroke')
+            elif kind == 'rect':
+                x, y, width, height, color = op[1:]
+                lines.append('{} {} {:.2f} {:.2f} rectfill'.format(
+                    setcolor(color), point(x, y), width * sx, height * sy))
+            elif kind == 'dot':
+                x, y, size, color = op[1:]
+                lines.append('{} newpath {} {} 0 360 arc fill'.format(
+                    setcolor(color), point(x, y), size / 2))
+        lines.extend(['showpage', '%%EOF'])
+        return '\n'.join(lines) + '\n'
+
+    #
+    # PNG output
+    #
+    def to_png(self):
+        "Returns the picture as the contents of a PNG file."
+        w, h = self.width, self.height
+        pixels = bytearray(bytes(color_to_rgb(self.background)) * (w * h))
+
+        def fill_span(y, x0, x1, rgb):
+            # Fill the pixels from x0 to x1 (inclusive) on row y.
+            if 0 <= y < h:
+                x0, x1 = max(0, x0), min(w - 1, x1)
+                if x0 <= x1:
+                    pixels[3 * (y*w + x0):3 * (y*w + x1 + 1)] = rgb * (x1 - x0 + 1)
+
+        def fill_circle(cx, cy, r, rgb):
+            r = max(r, 0.5)
+            for y in range(math.floor(cy - r), math.ceil(cy + r) + 1):
+                dy = y + 0.5 - cy
+                if abs(dy) <= r:
+                    dx = math.sqrt(r*r - dy*dy)
+                    fill_span(y, round(cx - dx), round(cx + dx) - 1, rgb)
+
+        sx, sy = self._scale()
+        for op in self.ops:
+            kind = op[0]
+            if kind == 'line':
+                points, color, width = op[1:]
+                rgb = bytes(color_to_rgb(color))
+                pixel_points = [self._pixel(x, y) for x, y in points]
+                for (x0, y0), (x1, y1) in zip(pixel_points, pixel_points[1:]):
+                    # Stamp a circle of the line's width at every pixel.
+                    n = max(1, math.ceil(max(abs(x1 - x0), abs(y1 - y0))))
+                    for i in range(n + 1):
+                        fill_circle(x0 + (x1 - x0) * i / n,
+                                    y0 + (y1 - y0) * i / n, width / 2, rgb)
+            elif kind == 'rect':
+                x, y, width, height, color = op[1:]
+                rgb = bytes(color_to_rgb(color))
+                px0, py0 = self._pixel(x, y + height)
+                px1, py1 = self._pixel(x + width, y)
+                for row in range(round(py0), round(py1)):
+                    fill_span(row, round(px0), round(px1) - 1, rgb)
+            elif kind == 'dot':
+                x, y, size, color = op[1:]
+                px, py = self._pixel(x, y)
+                fill_circle(px, py, size / 2, bytes(color_to_rgb(color)))
+
+        # Each row of the image data starts with a filter-type byte of 0.
+        stride = 3 * w
+        raw = b''.join(b'\0' + pixels[y*stride:(y+1)*stride] for y in range(h))
+
+        def chunk(kind, data):
+            return (struct.pack('>I', len(data)) + kind + data +
+                    struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+        return (b'\x89PNG\r\n\x1a\n' +
+                chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0)) +
+                chunk(b'IDAT', zlib.compress(raw)) +
+                chunk(b'IEND', b''))
+
+
+class RecordingTurtle:
+    """A stand-in for turtle.Turtle that records lines into a Frame.
+
+    Supports the movement and pen methods used by the examples:
+    forward(), back(), left(), right(), setheading(), setpos()/goto(),
+    home(), penup(), pendown(), pencolor(), pensize() and dot().
+    Nothing is drawn until the frame is flushed to a target.
+
+    Attributes:
+    frame : the Frame receiving the recorded operations
+    """
+    def __init__(self, frame=None):
+        if frame is None:
+            frame = Frame()
+        self.frame = frame
+        self.x = self.y = 0.0
+        self.heading = 0.0
+        self.is_down = True
+        self.color = 'black'
+        self.width = 1
+        self.path = None
+
+    def _end_path(self):
+        # Record the line traced since the pen last went down.
+        if self.path is not None:
+            self.frame.line(self.path, self.color, self.width)
+            self.path = None
+
+    def setpos(self, x, y=None):
+        if y is None:
+            x, y = x
+        if self.is_down:
+            if self.path is None:
+                self.path = [(self.x, self.y)]
+            self.path.append((x, y))
+        self.x, self.y = x, y
+
+    goto = setpos
+
+    def position(self):
+        return (self.x, self.y)
+
+    def forward(self, distance):
+        angle = math.radians(self.heading)
+        self.setpos(self.x + distance * math.cos(angle),
+                    self.y + distance * math.sin(angle))
+
+    def back(self, distance):
+        self.forward(-distance)
+
+    def left(self, angle):
+        self.heading = (self.heading + angle) % 360
+
+    def right(self, angle):
+        self.left(-angle)
+
+    def setheading(self, angle):
+        self.heading = angle % 360
+
+    def home(self):
+        self.setpos(0, 0)
+        self.setheading(0)
+
+    def penup(self):
+        self._end_path()
+        self.is_down = False
+
+    def pendown(self):
+        self.is_down = True
+
+    def pencolor(self, color=None):
+        if color is None:
+            return self.color
+        self._end_path()
+        self.color = color
+
+    def pensize(self, width=None):
+        if width is None:
+            return self.width
+        self._end_path()
+        self.width = width
+
+    def dot(self, size=None, color=None):
+        if size is None:
+            size = max(self.width + 4, self.width * 2)
+        self.frame.dot(self.x, self.y, size, color or self.color)
+
+    def finish(self):
+        """(): Frame
+
+        Records any line still being traced and returns the frame.
+        """
+        self._end_path()
+        return self.frame
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
-import unittest, math
+import contextlib, io, unittest, math
 import gravity
+import render
 
 class TestGravity(unittest.TestCase):
     def test_attraction_error(self):
@@ -34,6 +35,46 @@ class TestGravity(unittest.TestCase):
         self.assertAlmostEqual(fy, gravity.G/20000 * (math.sqrt(2)/2),
                                places=15)
 
+    def test_headless_loop(self):
+        "The simulation can be drawn on an image without a window."
+        bodies = gravity.make_bodies(headless=True)
+        target = render.ImageTarget(600, 600)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            gravity.loop(bodies, target, steps=10)
+        self.assertEqual(output.getvalue().count('Step #'), 10)
+        dots = [op for op in target.ops if op[0] == 'dot']
+        self.assertEqual(len(dots), 30)
+        self.assertEqual(target.frame_number, 10)
+        self.assertEqual({op[-1] for op in dots}, {'yellow', 'blue', 'red'})
+
+    def test_trails(self):
+        trails = gravity.Trails(2, min_distance=1)
+        self.assertEqual(trails.latest(), ([[], []], None))
+        trails.add([(0, 0), (10, 10)])
+        trails.add([(0.5, 0), (12, 10)], 'step 2')
+        trails.add([(1.5, 0), (14, 10)], 'step 3')
+        self.assertEqual(trails.latest(), ([[(0, 0), (1.5, 0)],
+                                            [(10, 10), (12, 10), (14, 10)]],
+                                           'step 3'))
+
+        # Points are still compared with the last point recorded.
+        trails.add([(2, 0), (14.5, 10)], 'step 4')
+        self.assertEqual(trails.latest(), ([[(0, 0), (1.5, 0)],
+                                            [(10, 10), (12, 10), (14, 10)]],
+                                           'step 4'))
+
+    def test_trails_bounded(self):
+        "Only the most recent points of each trail are kept."
+        trails = gravity.Trails(2, length=100)
+        for i in range(10000):
+            angle = i / 10
+            trails.add([(100 * math.cos(angle), 100 * math.sin(angle)),
+                        (i, 0)])
+        paths, info = trails.latest()
+        self.assertEqual([len(points) for points in paths], [100, 100])
+        self.assertEqual(paths[1][0], (9900, 0))
+        self.assertEqual(paths[1][-1], (9999, 0))
+
         
 if __name__ == '__main__':
     unittest.main()
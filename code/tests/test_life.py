@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-import unittest
+import threading, unittest
 import life
 
 class TestLife(unittest.TestCase):
@@ -105,6 +105,84 @@ class TestLife(unittest.TestCase):
         self.assertIn((5,6), self.board.state)
 
 
+    def test_compile_rule(self):
+        table = life.compile_rule('B36/S23')
+        self.assertEqual([n for n in range(9) if table[n]], [3, 6])
+        self.assertEqual([n for n in range(9) if table[9+n]], [2, 3])
+        self.assertEqual(life.compile_rule('b3/s23'),
+                         life.compile_rule(life.RULES['life']))
+
+    def test_invalid_rule(self):
+        self.assertRaises(ValueError, life.compile_rule, '23/3')
+        self.assertRaises(ValueError, life.compile_rule, 'B39/S23')
+        self.assertRaises(ValueError, life.LifeBoard, 10, 10, 'B3')
+
+    def test_highlife_birth(self):
+        "Under HighLife, an empty cell with six neighbours becomes alive"
+        board = life.LifeBoard(10, 10, 'highlife')
+        for (x,y) in [(4,4), (4,5), (4,6), (6,4), (6,5), (6,6)]:
+            board.set(x,y)
+
+        board.step()
+        self.assertIn((5,5), board.state)
+
+        # Under Conway's rules, the cell stays empty.
+        self.board.state = {(4,4), (4,5), (4,6), (6,4), (6,5), (6,6)}
+        self.board.step()
+        self.assertNotIn((5,5), self.board.state)
+
+    def test_background_stepper(self):
+        "The background stepper produces the same generations as step()"
+        self.board.makeRandom()
+        original = set(self.board.state)
+        board = life.LifeBoard(10, 10)
+        board.state = set(original)
+
+        stepper = life.BackgroundStepper(self.board)
+        stepper.start()
+        try:
+            for i in range(5):
+                board.step()
+                state = stepper.queue.get(timeout=5)
+                self.assertEqual(state, board.state)
+        finally:
+            stepper.stop(wait=True)
+
+        # The original board is left alone.
+        self.assertEqual(self.board.state, original)
+
+    def test_background_stepper_edit(self):
+        "The board can be changed while a stopped stepper finishes a step"
+        errors = []
+        old_hook = threading.excepthook
+        threading.excepthook = errors.append
+        try:
+            board = life.LifeBoard(300, 300)
+            board.makeRandom()
+            stepper = life.BackgroundStepper(board)
+            stepper.start()
+            state = None
+            while state is None:
+                state = stepper.next_state()
+            board.state = state
+            stepper.stop()
+            board.makeRandom()
+            board.erase()
+            stepper.thread.join(timeout=10)
+        finally:
+            threading.excepthook = old_hook
+        self.assertFalse(stepper.thread.is_alive())
+        self.assertEqual(errors, [])
+
+    def test_background_stepper_stop(self):
+        "Stopping the background stepper doesn't wait for the worker"
+        stepper = life.BackgroundStepper(self.board)
+        stepper.start()
+        stepper.stop()
+        self.assertTrue(stepper.stopped.is_set())
+        stepper.thread.join(timeout=5)
+        self.assertFalse(stepper.thread.is_alive())
+
         
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import random, unittest
+import life
+import lifeensemble
+
+def random_boards(count, xsize, ysize, rule='B3/S23', seed=0):
+    rng = random.Random(seed)
+    boards = []
+    for k in range(count):
+        board = life.LifeBoard(xsize, ysize, rule)
+        density = rng.random()
+        for x in range(xsize):
+            for y in range(ysize):
+                if rng.random() < density:
+                    board.set(x, y)
+        boards.append(board)
+    return boards
+
+class TestLifeEnsemble(unittest.TestCase):
+    def check_rule(self, rule, generations=20):
+        boards = random_boards(12, 9, 7, rule)
+        ensemble = lifeensemble.LifeEnsemble.from_boards(boards)
+        for generation in range(generations):
+            ensemble.step()
+            for board in boards:
+                board.step()
+            self.assertEqual([b.state for b in ensemble.to_boards()],
+                             [b.state for b in boards])
+            self.assertEqual(ensemble.populations(),
+                             [len(b.state) for b in boards])
+            self.assertEqual(ensemble.extinct(),
+                             [not b.state for b in boards])
+
+    def test_life(self):
+        self.check_rule('B3/S23')
+
+    def test_other_rules(self):
+        for rule in ('B36/S23', 'B3678/S34678', 'B2/S', 'B0/S8'):
+            self.check_rule(rule, generations=5)
+
+    def test_blinker(self):
+        ensemble = lifeensemble.LifeEnsemble(3, 10, 10)
+        ensemble.set_state(1, {(4, 5), (5, 5), (6, 5)})
+        ensemble.step()
+        self.assertEqual(ensemble.get_state(1), {(5, 4), (5, 5), (5, 6)})
+        self.assertEqual(ensemble.populations(), [0, 3, 0])
+        self.assertEqual(ensemble.extinct(), [True, False, True])
+
+    def test_edges(self):
+        "Cells on the edge of one board don't affect its neighbours."
+        ensemble = lifeensemble.LifeEnsemble(3, 4, 4)
+        ensemble.set_state(1, {(0, 0), (1, 0), (2, 0), (3, 0),
+                               (0, 3), (1, 3), (2, 3), (3, 3)})
+        ensemble.step()
+        self.assertEqual(ensemble.get_state(0), set())
+        self.assertEqual(ensemble.get_state(2), set())
+
+    def test_randomize(self):
+        rng = random.Random(0)
+        ensemble = lifeensemble.LifeEnsemble(200, 10, 10)
+        ensemble.randomize(0.25, rng)
+        populations = ensemble.populations()
+        self.assertAlmostEqual(sum(populations) / (200 * 100), 0.25,
+                               delta=0.02)
+        self.assertEqual(populations,
+                         [len(board.state) for board in ensemble.to_boards()])
+
+        ensemble.randomize(0, rng)
+        self.assertEqual(ensemble.extinct(), [True] * 200)
+        ensemble.randomize(1, rng)
+        self.assertEqual(ensemble.populations(), [100] * 200)
+
+    def test_errors(self):
+        ensemble = lifeensemble.LifeEnsemble(2, 4, 4)
+        self.assertRaises(ValueError, ensemble.set_state, 0, {(4, 0)})
+        self.assertRaises(ValueError, lifeensemble.LifeEnsemble.from_boards,
+                          [life.LifeBoard(4, 4), life.LifeBoard(5, 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import os, random, tempfile, unittest
+import life
+import liferecord
+
+class TestLifeRecord(unittest.TestCase):
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def record_run(self, generations, interval):
+        "Record a random run, returning the list of states."
+        random.seed(1)
+        board = life.LifeBoard(30, 20)
+        board.makeRandom()
+        states = []
+        with liferecord.Recorder(self.filename, 30, 20,
+                                 interval=interval) as recorder:
+            for i in range(generations):
+                recorder.add(board.state)
+                states.append(board.state)
+                board.step()
+        return states
+
+    def test_replay(self):
+        states = self.record_run(120, interval=25)
+        with liferecord.Recording(self.filename) as recording:
+            self.assertEqual((recording.xsize, recording.ysize), (30, 20))
+            self.assertEqual(recording.rule, 'B3/S23')
+            self.assertEqual(recording.generations, 120)
+            self.assertEqual(list(recording.replay()), states)
+            self.assertEqual(list(recording.replay(110)), states[110:])
+
+    def test_seek(self):
+        states = self.record_run(120, interval=25)
+        generations = list(range(120))
+        random.shuffle(generations)
+        with liferecord.Recording(self.filename) as recording:
+            for generation in generations:
+                self.assertEqual(recording.state(generation),
+                                 states[generation])
+            self.assertRaises(IndexError, recording.state, 120)
+            self.assertRaises(IndexError, recording.state, -1)
+
+    def test_unclosed(self):
+        "A recording that was never closed can be read up to its last block."
+        random.seed(1)
+        board = life.LifeBoard(30, 20)
+        board.makeRandom()
+        states = []
+        recorder = liferecord.Recorder(self.filename, 30, 20, interval=25)
+        for i in range(60):
+            recorder.add(board.state)
+            states.append(board.state)
+            board.step()
+        # Simulate the program being killed: the last, unfinished block
+        # and the index are never written.
+        recorder.f.close()
+
+        with liferecord.Recording(self.filename) as recording:
+            self.assertFalse(recording.complete)
+            self.assertEqual(recording.generations, 50)
+            self.assertEqual(list(recording.replay()), states[:50])
+
+    def test_truncated(self):
+        "A truncated recording keeps the blocks that are still whole."
+        states = self.record_run(120, interval=25)
+        with liferecord.Recording(self.filename) as recording:
+            self.assertTrue(recording.complete)
+            offset, length = recording.blocks[3]
+        for size, generations in ((offset + length, 100),
+                                  (offset + length - 1, 75),
+                                  (offset - 4, 75),
+                                  (offset - 2, 75)):
+            with open(self.filename, 'r+b') as f:
+                f.truncate(size)
+            with liferecord.Recording(self.filename) as recording:
+                self.assertFalse(recording.complete)
+                self.assertEqual(recording.generations, generations)
+                self.assertEqual(list(recording.replay()),
+                                 states[:generations])
+
+    def test_empty(self):
+        liferecord.Recorder(self.filename, 10, 10).close()
+        with liferecord.Recording(self.filename) as recording:
+            self.assertEqual(recording.generations, 0)
+            self.assertEqual(list(recording.replay()), [])
+
+    def test_not_a_recording(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'not a recording')
+        self.assertRaises(ValueError, liferecord.Recording, self.filename)
+        with open(self.filename, 'wb') as f:
+            f.write(liferecord.MAGIC + b'\0\0')
+        self.assertRaises(ValueError, liferecord.Recording, self.filename)
+
+    def test_varint(self):
+        out = bytearray()
+        for n in (0, 1, 127, 128, 300, 2**40):
+            liferecord._write_varint(out, n)
+        pos = 0
+        for n in (0, 1, 127, 128, 300, 2**40):
+            value, pos = liferecord._read_varint(out, pos)
+            self.assertEqual(value, n)
+
+
+if __name__ == '__main__':
+    unittest.main()
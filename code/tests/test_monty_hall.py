@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import contextlib
+import importlib.util
+import io
+import math
+import os
+import random
+import statistics
+import unittest
+from fractions import Fraction
+from unittest import mock
+
+# The script's name contains a hyphen, so it can't be imported with
+# an ordinary import statement.
+_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                     os.pardir, 'monty-hall.py')
+_spec = importlib.util.spec_from_file_location('monty_hall', _path)
+monty_hall = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(monty_hall)
+
+class TestMontyHall(unittest.TestCase):
+    def setUp(self):
+        random.seed(1234)
+
+    def test_play_game(self):
+        "The host leaves the first choice and the prize door closed."
+        for num_doors in (3, 4, 10):
+            for i in range(200):
+                winning_door, choice, closed_doors = \
+                    monty_hall.play_game(num_doors)
+                self.assertEqual(len(closed_doors), 2)
+                self.assertEqual(closed_doors, sorted(set(closed_doors)))
+                self.assertIn(choice, closed_doors)
+                self.assertIn(winning_door, closed_doors)
+                for door in closed_doors:
+                    self.assertTrue(0 <= door < num_doors)
+
+    def test_identical_games(self):
+        "Every strategy is offered the same games."
+        seen = {name: [] for name in ('a', 'b', 'c')}
+
+        def recorder(name):
+            def strategy(choice, closed_doors):
+                seen[name].append((choice, tuple(closed_doors)))
+                return choice
+            return strategy
+
+        strategies = {name: recorder(name) for name in seen}
+        strategies['random'] = monty_hall.random_switch
+        monty_hall.compare_strategies(3, 500, strategies)
+        self.assertEqual(len(seen['a']), 500)
+        self.assertEqual(seen['a'], seen['b'])
+        self.assertEqual(seen['a'], seen['c'])
+        self.assertGreater(len(set(seen['a'])), 1)
+
+    def test_complementary(self):
+        "Exactly one of always_switch and never_switch wins each game."
+        for i in range(500):
+            winning_door, choice, closed_doors = monty_hall.play_game(5)
+            stay = monty_hall.never_switch(choice, closed_doors)
+            switch = monty_hall.always_switch(choice, closed_doors)
+            self.assertNotEqual(stay == winning_door,
+                                switch == winning_door)
+
+        trials = 1000
+        wins, diffs = monty_hall.compare_strategies(
+            3, trials, {'always': monty_hall.always_switch,
+                        'never': monty_hall.never_switch})
+        self.assertEqual(wins['always'] + wins['never'], trials)
+        mean, stderr = diffs['always', 'never']
+        self.assertAlmostEqual(mean, (wins['always'] - wins['never']) / trials)
+
+    def test_paired_stderr(self):
+        "The standard error of the paired differences is computed correctly."
+        # A fixed sequence of games: (winning_door, choice, closed_doors).
+        games = [(0, 0, [0, 1]), (1, 0, [0, 1]), (2, 2, [1, 2]),
+                 (1, 0, [0, 1]), (2, 1, [1, 2]), (0, 0, [0, 2]),
+                 (1, 1, [0, 1])]
+        strategies = {'never': monty_hall.never_switch,
+                      'always': monty_hall.always_switch,
+                      'low': lambda choice, closed_doors: closed_doors[0]}
+        with mock.patch.object(monty_hall, 'play_game',
+                               side_effect=games):
+            wins, diffs = monty_hall.compare_strategies(3, len(games),
+                                                        strategies)
+
+        won = {name: [strategy(choice, closed) == winning
+                      for winning, choice, closed in games]
+               for name, strategy in strategies.items()}
+        self.assertEqual(wins, {name: sum(w) for name, w in won.items()})
+        self.assertEqual(set(diffs), {('never', 'always'), ('never', 'low'),
+                                      ('always', 'low')})
+        for (a, b), (mean, stderr) in diffs.items():
+            d = [x - y for x, y in zip(won[a], won[b])]
+            self.assertAlmostEqual(mean, statistics.mean(d))
+            self.assertAlmostEqual(stderr,
+                                   statistics.stdev(d) / math.sqrt(len(d)))
+
+    def test_single_trial(self):
+        "With one trial the standard error is undefined."
+        wins, diffs = monty_hall.compare_strategies(
+            3, 1, {'never': monty_hall.never_switch,
+                   'always': monty_hall.always_switch})
+        mean, stderr = diffs['never', 'always']
+        self.assertIn(mean, (-1, 1))
+        self.assertTrue(math.isnan(stderr))
+
+class TestExact(unittest.TestCase):
+    def test_game_tree(self):
+        "The probabilities of all the possible games add up to 1."
+        for num_doors in (3, 4, 7):
+            leaves = monty_hall.game_tree(num_doors)
+            self.assertEqual(sum(p for p, *game in leaves), 1)
+            for p, winning_door, choice, closed_doors in leaves:
+                self.assertIn(choice, closed_doors)
+                self.assertIn(winning_door, closed_doors)
+
+    def test_exact_probabilities(self):
+        self.assertEqual(monty_hall.exact_probabilities(3),
+                         {'never': Fraction(1, 3), 'always': Fraction(2, 3),
+                          'random': Fraction(1, 2)})
+        self.assertEqual(monty_hall.exact_probabilities(4),
+                         {'never': Fraction(1, 4), 'always': Fraction(3, 4),
+                          'random': Fraction(1, 2)})
+
+    def test_copy(self):
+        "Changing the returned dictionary doesn't change later results."
+        exact = monty_hall.exact_probabilities(3)
+        exact['never'] = Fraction(1)
+        self.assertEqual(monty_hall.exact_probabilities(3)['never'],
+                         Fraction(1, 3))
+
+    def test_custom_strategy(self):
+        "A deterministic strategy is evaluated without switch_probability."
+        def lowest_door(choice, closed_doors):
+            return closed_doors[0]
+        def highest_door(choice, closed_doors):
+            return closed_doors[1]
+        self.assertFalse(hasattr(lowest_door, 'switch_probability'))
+        exact = monty_hall.exact_probabilities(
+            3, {'lowest': lowest_door, 'highest': highest_door})
+        # Whichever closed door is lowest, the prize is equally likely
+        # to be behind either one.
+        self.assertEqual(exact, {'lowest': Fraction(1, 2),
+                                 'highest': Fraction(1, 2)})
+
+    def test_validate(self):
+        random.seed(1234)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertTrue(monty_hall.validate(3, 2000))
+        self.assertNotIn('FAILED', output.getvalue())
+
+        wrong = dict(monty_hall.exact_probabilities(3))
+        wrong['always'] = Fraction(1, 2)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertFalse(monty_hall.validate(3, 2000, exact=wrong))
+        self.assertIn('FAILED', output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+# Large-scale tests for the Life and gravity engines.
+#
+# Each engine is run on large randomized inputs and its results are
+# compared with a reference implementation.  Each engine is also timed
+# against the reference on the same input, and the test fails if the
+# engine is slower than the reference by more than its allowed ratio.
+# Timing relative to the reference, rather than against fixed budgets,
+# keeps the tests meaningful on both fast and slow machines.  Each ratio
+# is about twice the engine's measured time relative to the reference,
+# so that a real slowdown is caught but timing noise isn't.
+
+import math, os, random, time, unittest
+import gravity
+import gravity_parallel
+import life
+import lifeensemble
+
+def best_time(func, repeat=3):
+    "Returns the shortest of 'repeat' timings of func()."
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+#
+# Life
+#
+def reference_step(state, xsize, ysize, birth=(3,), survival=(2, 3)):
+    """(set, int, int, [int], [int]): set
+
+    The straightforward Life algorithm: visit every cell of the board
+    and count its live neighbours.  Returns the new set of live cells.
+    """
+    d = set()
+    for i in range(xsize):
+        for j in range(ysize):
+            s = 0
+            for yp in range(max(0, j-1), min(ysize, j+2)):
+                for xp in range(max(0, i-1), min(xsize, i+2)):
+                    if (xp, yp) != (i, j) and (xp, yp) in state:
+                        s += 1
+            live = (i, j) in state
+            if (live and s in survival) or (not live and s in birth):
+                d.add((i, j))
+    return d
+
+def random_board(xsize, ysize, seed, density=0.35, rule='B3/S23'):
+    rng = random.Random(seed)
+    board = life.LifeBoard(xsize, ysize, rule)
+    for i in range(xsize):
+        for j in range(ysize):
+            if rng.random() < density:
+                board.set(i, j)
+    return board
+
+def step_board(board):
+    board.step()
+
+def step_ensemble(board):
+    ensemble = lifeensemble.LifeEnsemble.from_boards([board])
+    ensemble.step()
+    board.state = ensemble.get_state(0)
+
+# Life engines as (name, function stepping a LifeBoard one generation,
+# allowed ratio of the engine's time to the reference's time).
+# Measured: LifeBoard.step 0.25, LifeEnsemble 0.12.
+LIFE_ENGINES = [
+    ('LifeBoard.step', step_board, 0.5),
+    ('LifeEnsemble', step_ensemble, 0.3),
+]
+
+class TestLifePerformance(unittest.TestCase):
+    XSIZE, YSIZE = 80, 60
+    GENERATIONS = 40
+
+    def test_matches_reference(self):
+        for name, step, ratio in LIFE_ENGINES:
+            for seed in range(2):
+                board = random_board(self.XSIZE, self.YSIZE, seed)
+                state = set(board.state)
+                for generation in range(self.GENERATIONS):
+                    step(board)
+                    state = reference_step(state, self.XSIZE, self.YSIZE)
+                    self.assertEqual(board.state, state,
+                                     '{} differs at generation {}'.format(
+                                         name, generation+1))
+
+    def test_rules(self):
+        # Check LifeBoard.step with other rules, including one
+        # where cells are born with no neighbours.
+        for rule in ('B36/S23', 'B3678/S34678', 'B2/S', 'B0/S8'):
+            birth, survival = (
+                [int(digit) for digit in part[1:]]
+                for part in rule.split('/'))
+            board = random_board(self.XSIZE, self.YSIZE, seed=2, rule=rule)
+            state = set(board.state)
+            for generation in range(self.GENERATIONS // 4):
+                board.step()
+                state = reference_step(state, self.XSIZE, self.YSIZE,
+                                       birth, survival)
+                self.assertEqual(board.state, state,
+                                 '{} differs at generation {}'.format(
+                                     rule, generation+1))
+
+    def test_speed(self):
+        board = random_board(self.XSIZE, self.YSIZE, seed=1)
+        reference = best_time(lambda: reference_step(board.state,
+                                                     self.XSIZE, self.YSIZE))
+        for name, step, ratio in LIFE_ENGINES:
+            def run():
+                b = life.LifeBoard(self.XSIZE, self.YSIZE)
+                b.state = set(board.state)
+                step(b)
+            elapsed = best_time(run)
+            self.assertLessEqual(elapsed, reference * ratio,
+                                 '{} took {:.4f}s; reference took {:.4f}s'
+                                 .format(name, elapsed, reference))
+
+class TestEnsemblePerformance(unittest.TestCase):
+    COUNT = 100
+    XSIZE, YSIZE = 16, 16
+    GENERATIONS = 15
+
+    def setUp(self):
+        self.boards = [random_board(self.XSIZE, self.YSIZE, seed)
+                       for seed in range(self.COUNT)]
+
+    def test_matches_reference(self):
+        ensemble = lifeensemble.LifeEnsemble.from_boards(self.boards)
+        states = [set(board.state) for board in self.boards]
+        for generation in range(self.GENERATIONS):
+            ensemble.step()
+            states = [reference_step(state, self.XSIZE, self.YSIZE)
+                      for state in states]
+        for k, state in enumerate(states):
+            self.assertEqual(ensemble.get_state(k), state,
+                             'board {} differs'.format(k))
+        self.assertEqual(ensemble.populations(),
+                         [len(state) for state in states])
+
+    def test_speed(self):
+        # Stepping the ensemble must be far faster than stepping
+        # each board individually; it measures about 0.002 times
+        # the time.
+        def run_boards():
+            for board in self.boards:
+                board.step()
+        ensemble = lifeensemble.LifeEnsemble.from_boards(self.boards)
+        individual = best_time(run_boards)
+        elapsed = best_time(ensemble.step)
+        self.assertLessEqual(elapsed, individual * 0.05,
+                             'LifeEnsemble took {:.4f}s; individual boards '
+                             'took {:.4f}s'.format(elapsed, individual))
+
+
+#
+# Gravity
+#
+def make_body():
+    "Returns a Body without a turtle window, for computation only."
+    return gravity.Body.headless()
+
+def random_bodies(n, seed):
+    rng = random.Random(seed)
+    bodies = []
+    for i in range(n):
+        body = make_body()
+        body.name = str(i)
+        body.mass = rng.uniform(1e24, 1e30)
+        body.px = rng.uniform(-2, 2) * gravity.AU
+        body.py = rng.uniform(-2, 2) * gravity.AU
+        bodies.append(body)
+    return bodies
+
+def reference_forces(bodies):
+    """([Body]): [(fx, fy)]
+
+    Adds up Body.attraction() over every pair of bodies.
+    """
+    forces = []
+    for body in bodies:
+        total_fx = total_fy = 0.0
+        for other in bodies:
+            if body is not other:
+                fx, fy = body.attraction(other)
+                total_fx += fx
+                total_fy += fy
+        forces.append((total_fx, total_fy))
+    return forces
+
+def serial_forces(bodies):
+    force = gravity.compute_forces(bodies)
+    return [force[body] for body in bodies]
+
+# ParallelForces engines, created when first needed for each number of
+# bodies and closed by tearDownModule().
+_parallel_engines = {}
+
+def parallel_forces(bodies):
+    engine = _parallel_engines.get(len(bodies))
+    if engine is None:
+        engine = gravity_parallel.ParallelForces(len(bodies), workers=2)
+        _parallel_engines[len(bodies)] = engine
+    force = engine.compute(bodies)
+    return [force[body] for body in bodies]
+
+def tearDownModule():
+    for engine in _parallel_engines.values():
+        engine.close()
+    _parallel_engines.clear()
+
+# Force engines as (name, function returning a list of (fx, fy) for
+# a list of bodies, allowed ratio of the engine's time to the
+# reference's time).  Measured: compute_forces 0.27; ParallelForces
+# 0.45 on a single CPU, and less with more CPUs.
+GRAVITY_ENGINES = [
+    ('compute_forces', serial_forces, 0.5),
+    ('ParallelForces', parallel_forces, 0.9),
+]
+
+class TestGravityPerformance(unittest.TestCase):
+    NUM_BODIES = 150
+
+    def assertForcesEqual(self, forces, expected, name):
+        for (fx, fy), (ex, ey) in zip(forces, expected):
+            scale = math.hypot(ex, ey)
+            self.assertLessEqual(math.hypot(fx - ex, fy - ey),
+                                 scale * 1e-9, name)
+
+    def test_matches_reference(self):
+        for name, forces, ratio in GRAVITY_ENGINES:
+            for seed in range(2):
+                bodies = random_bodies(self.NUM_BODIES, seed)
+                self.assertForcesEqual(forces(bodies),
+                                       reference_forces(bodies), name)
+
+    def test_speed(self):
+        bodies = random_bodies(self.NUM_BODIES, seed=1)
+        reference = best_time(lambda: reference_forces(bodies))
+        for name, forces, ratio in GRAVITY_ENGINES:
+            elapsed = best_time(lambda: forces(bodies))
+            self.assertLessEqual(elapsed, reference * ratio,
+                                 '{} took {:.4f}s; reference took {:.4f}s'
+                                 .format(name, elapsed, reference))
+
+class TestParallelForces(TestGravityPerformance):
+    def setUp(self):
+        self.engine = gravity_parallel.ParallelForces(self.NUM_BODIES,
+                                                      workers=2)
+
+    def tearDown(self):
+        self.engine.close()
+
+    def parallel_forces(self, bodies):
+        force = self.engine.compute(bodies)
+        return [force[body] for body in bodies]
+
+    def test_matches_reference(self):
+        for seed in range(2):
+            bodies = random_bodies(self.NUM_BODIES, seed)
+            self.assertForcesEqual(self.parallel_forces(bodies),
+                                   reference_forces(bodies), 'ParallelForces')
+
+    def test_matches_serial(self):
+        bodies = random_bodies(self.NUM_BODIES, seed=3)
+        self.assertForcesEqual(self.parallel_forces(bodies),
+                               serial_forces(bodies), 'ParallelForces')
+
+    def test_collision(self):
+        bodies = random_bodies(self.NUM_BODIES, seed=4)
+        bodies[5].px, bodies[5].py = bodies[9].px, bodies[9].py
+        self.assertRaises(ValueError, self.engine.compute, bodies)
+        self.assertRaises(ValueError, self.engine.compute, bodies[:10])
+
+    def test_dead_worker(self):
+        "A worker that dies is reported instead of hanging the caller."
+        bodies = random_bodies(self.NUM_BODIES, seed=5)
+        self.engine.compute(bodies)
+        self.engine.processes[0].kill()
+        start = time.perf_counter()
+        with self.assertRaises(RuntimeError):
+            self.engine.compute(bodies)
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertRaises(RuntimeError, self.engine.compute, bodies)
+
+    @unittest.skipUnless((os.cpu_count() or 1) >= 4,
+                         'needs at least 4 CPUs')
+    def test_speed(self):
+        # The workers do twice as much arithmetic as compute_forces(),
+        # which visits each pair of bodies once, so with four CPUs they
+        # should take about half as long.
+        bodies = random_bodies(self.NUM_BODIES, seed=1)
+        with gravity_parallel.ParallelForces(self.NUM_BODIES) as engine:
+            serial = best_time(lambda: gravity.compute_forces(bodies))
+            elapsed = best_time(lambda: engine.compute(bodies))
+        self.assertLessEqual(elapsed, serial * 0.8,
+                             'ParallelForces took {:.4f}s; compute_forces '
+                             'took {:.4f}s'.format(elapsed, serial))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import io, json, threading, unittest
+import profiling
+
+class TestProfiling(unittest.TestCase):
+    def test_disabled(self):
+        outfile = io.StringIO()
+        profiler = profiling.Profiler(outfile=outfile)
+        with profiler.phase('step'):
+            pass
+        profiler.count('steps')
+        profiler.dump()
+        self.assertEqual(profiler.phases, {})
+        self.assertEqual(profiler.counters, {})
+        self.assertEqual(outfile.getvalue(), '')
+
+    def test_dump(self):
+        outfile = io.StringIO()
+        profiler = profiling.Profiler(enabled=True, interval=0,
+                                      outfile=outfile)
+        for i in range(3):
+            with profiler.phase('step'):
+                pass
+        profiler.count('steps', 3)
+        profiler.tick()
+
+        report = json.loads(outfile.getvalue())
+        self.assertEqual(report['counters'], {'steps': 3})
+        self.assertEqual(report['phases']['step']['calls'], 3)
+        self.assertEqual(sum(report['phases']['step']['histogram_us'].values()),
+                         3)
+
+        # Dumping starts a new collection period.
+        self.assertEqual(profiler.phases, {})
+
+    def test_threads(self):
+        "Recording in one thread while another dumps loses nothing."
+        outfile = io.StringIO()
+        profiler = profiling.Profiler(enabled=True, outfile=outfile)
+
+        def record():
+            for i in range(2000):
+                with profiler.phase('phase{}'.format(i % 50)):
+                    pass
+                profiler.count('calls')
+
+        thread = threading.Thread(target=record)
+        thread.start()
+        while thread.is_alive():
+            profiler.dump()
+        thread.join()
+        profiler.dump()
+
+        reports = [json.loads(line)
+                   for line in outfile.getvalue().splitlines()]
+        self.assertEqual(sum(report['counters'].get('calls', 0)
+                             for report in reports), 2000)
+        self.assertEqual(sum(stats['calls'] for report in reports
+                             for stats in report['phases'].values()), 2000)
+
+    def test_histogram(self):
+        stats = profiling.PhaseStats()
+        stats.add(0)
+        stats.add(3e-6)
+        stats.add(5e-6)
+        self.assertEqual(stats.histogram, {1: 1, 4: 1, 8: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
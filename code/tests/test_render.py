@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import unittest, zlib
+import render
+
+class TestRender(unittest.TestCase):
+    def test_color_to_rgb(self):
+        self.assertEqual(render.color_to_rgb('red'), (255, 0, 0))
+        self.assertEqual(render.color_to_rgb('#33cc8c'), (0x33, 0xcc, 0x8c))
+        self.assertRaises(ValueError, render.color_to_rgb, 'octarine')
+
+    def test_clear(self):
+        target = render.ImageTarget(10, 10)
+        frame = render.Frame()
+        frame.dot(0, 0, 3)
+        target.flush(frame)
+        self.assertEqual(len(target.ops), 1)
+
+        frame = render.Frame()
+        frame.clear()
+        frame.rect(0, 0, 1, 1)
+        target.flush(frame)
+        self.assertEqual(target.ops, [('rect', 0, 0, 1, 1, 'black')])
+
+    def test_png(self):
+        target = render.ImageTarget(4, 2, world=(0, 0, 4, 2))
+        frame = render.Frame()
+        frame.rect(0, 0, 2, 1, 'blue')
+        target.flush(frame)
+        data = target.to_png()
+        self.assertTrue(data.startswith(b'\x89PNG\r\n\x1a\n'))
+
+        # Decode the image data: the bottom row has two blue pixels.
+        start = data.index(b'IDAT') + 4
+        raw = zlib.decompress(data[start:])
+        top, bottom = raw[:13], raw[13:]
+        self.assertEqual(top, b'\0' + b'\xff' * 12)
+        self.assertEqual(bottom, b'\0' + b'\0\0\xff' * 2 + b'\xff' * 6)
+
+    def test_svg(self):
+        target = render.ImageTarget(20, 20)
+        frame = render.Frame()
+        frame.line([(-10, -10), (10, 10)], 'red', 2)
+        target.flush(frame)
+        svg = target.to_svg()
+        self.assertIn('points="0.00,20.00 20.00,0.00"', svg)
+        self.assertIn('stroke="red"', svg)
+
+    def test_recording_turtle(self):
+        t = render.RecordingTurtle()
+        t.penup()
+        t.goto(10, 10)
+        t.pendown()
+        t.pencolor('blue')
+        for i in range(4):
+            t.forward(5)
+            t.right(90)
+        frame = t.finish()
+        self.assertEqual(len(frame.ops), 1)
+        kind, points, color, width = frame.ops[0]
+        self.assertEqual(color, 'blue')
+        self.assertEqual(len(points), 5)
+        for (x, y), (ex, ey) in zip(points, [(10, 10), (15, 10), (15, 5),
+                                             (10, 5), (10, 10)]):
+            self.assertAlmostEqual(x, ex)
+            self.assertAlmostEqual(y, ey)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-import unittest
+import contextlib, io, os, tempfile, threading, unittest
 import to_celsius
 
 class TestCelsius(unittest.TestCase):
@@ -16,6 +16,111 @@ class TestCelsius(unittest.TestCase):
     def test_error(self):
         self.assertRaises(ValueError, to_celsius.convert_f2c, 'abc')
 
+    def test_stream(self):
+        infile = io.StringIO('32\n212\n\n-40\n')
+        outfile = io.StringIO()
+        errors = to_celsius.convert_stream(infile, outfile, chunk_size=4)
+        self.assertEqual(errors, 0)
+        self.assertEqual(outfile.getvalue(),
+                         '32\N{DEGREE SIGN}F = 0\N{DEGREE SIGN}C\n'
+                         '212\N{DEGREE SIGN}F = 100\N{DEGREE SIGN}C\n'
+                         '-40\N{DEGREE SIGN}F = -40\N{DEGREE SIGN}C\n')
+
+    def test_stream_error(self):
+        output, errors = to_celsius.convert_lines(['32\n', 'abc\n', '212\n'])
+        self.assertEqual(errors, [(1, 'abc')])
+        self.assertEqual(output.count('\n'), 2)
+
+    def test_find_chunks(self):
+        data = b'1\n22\n333\n4444\n55555'
+        chunks = list(to_celsius.find_chunks(data, 4))
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b''.join(data[start:end] for start, end in chunks),
+                         data)
+        for start, end in chunks[:-1]:
+            self.assertEqual(data[end-1:end], b'\n')
+
+    def test_parallel(self):
+        lines = ['{}\n'.format(i) for i in range(-50, 1000)]
+        lines[7] = 'abc\n'
+        lines[900] = 'xyz\n'
+        fd, filename = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(lines)
+        try:
+            expected = io.StringIO()
+            with contextlib.redirect_stderr(io.StringIO()) as stream_errors:
+                to_celsius.convert_stream(io.StringIO(''.join(lines)),
+                                          expected, chunk_size=100)
+            outfile = io.StringIO()
+            with contextlib.redirect_stderr(io.StringIO()) as messages:
+                errors = to_celsius.convert_file_parallel(filename, outfile,
+                                                          workers=2,
+                                                          chunk_size=100)
+        finally:
+            os.remove(filename)
+        self.assertEqual(errors, 2)
+        self.assertEqual(outfile.getvalue(), expected.getvalue())
+        # Both modes report the same line numbers.
+        self.assertEqual(messages.getvalue(),
+                         "line 8: 'abc' is not a numeric value\n"
+                         "line 901: 'xyz' is not a numeric value\n")
+        self.assertEqual(stream_errors.getvalue(), messages.getvalue())
+
+    def test_parallel_line_breaks(self):
+        "Only newlines separate values, as in streaming mode."
+        fd, filename = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'32\n1\x0c2\nabc\n212\n')
+        try:
+            outfile = io.StringIO()
+            errors = to_celsius.convert_file_parallel(filename, outfile,
+                                                      workers=1)
+            output, stream_errors = to_celsius.convert_lines(
+                ['32\n', '1\x0c2\n', 'abc\n', '212\n'])
+        finally:
+            os.remove(filename)
+        self.assertEqual(errors, 2)
+        self.assertEqual(outfile.getvalue(), output)
+        self.assertEqual(stream_errors, [(1, '1\x0c2'), (2, 'abc')])
+
+    def test_server(self):
+        path = os.path.join(tempfile.mkdtemp(), 'celsius.sock')
+        server = to_celsius.make_server(path)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            with to_celsius.ConversionClient(path) as client:
+                self.assertEqual(client.convert(['32', '212', 'abc']),
+                                 [0, 100, None])
+                self.assertEqual(client.convert(['-40']), [-40])
+                self.assertEqual(client.convert([]), [])
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+
+    def test_server_close(self):
+        "Closing the server doesn't wait for connected clients."
+        path = os.path.join(tempfile.mkdtemp(), 'celsius.sock')
+        server = to_celsius.make_server(path)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        client = to_celsius.ConversionClient(path)
+        try:
+            self.assertEqual(client.convert(['32']), [0])
+            server.shutdown()
+            thread.join()
+            closer = threading.Thread(target=server.server_close)
+            closer.start()
+            closer.join(timeout=2)
+            self.assertFalse(closer.is_alive())
+        finally:
+            client.close()
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 
-import sys
+import os, sys
+
+# The modules needed by the parallel, server and client modes are
+# imported by the functions that use them, so that converting a few
+# values on the command line starts up as quickly as possible.
+
+# Approximate number of bytes read at once in streaming mode.
+CHUNK_SIZE = 1024 * 1024
 
 def convert_f2c(S):
     """(str): float
@@ -12,11 +19,312 @@ def convert_f2c(S):
     celsius = (fahrenheit - 32) * 5 / 9
     return celsius
 
+def format_result(arg, celsius):
+    """(str, float): str
+
+    Returns the line of output reporting a single conversion.
+    """
+    return '{}\N{DEGREE SIGN}F = {:g}\N{DEGREE SIGN}C'.format(
+        arg, round(celsius, 0))
+
+def convert_lines(lines):
+    """([str]): (str, [str])
+
+    Converts a batch of lines, each holding one Fahrenheit value.
+    Returns the output text for the whole batch and a list of
+    (index, value) pairs for the values that weren't numeric, where
+    'index' is the position of the line within 'lines'.
+    Blank lines are ignored.
+    """
+    try:
+        # Fast path: convert the whole batch at once.
+        # float() ignores the surrounding whitespace and newline.
+        values = [(line.strip(), (float(line) - 32) * 5 / 9)
+                  for line in lines]
+        errors = []
+    except ValueError:
+        # At least one line is bad, so convert them one at a time.
+        values = []
+        errors = []
+        for i, line in enumerate(lines):
+            arg = line.strip()
+            if not arg:
+                continue
+            try:
+                celsius = convert_f2c(arg)
+            except ValueError:
+                errors.append((i, arg))
+            else:
+                values.append((arg, celsius))
+
+    output = ''.join(format_result(arg, celsius) + '\n'
+                     for arg, celsius in values)
+    return output, errors
+
+def convert_stream(infile, outfile, chunk_size=CHUNK_SIZE):
+    """(file, file, int): int
+
+    Converts Fahrenheit values read from 'infile', one per line,
+    writing the results to 'outfile'.  The input is read in batches
+    of about 'chunk_size' bytes, so memory use doesn't grow with the
+    size of the input.  Non-numeric values are reported along with
+    their line numbers.  Returns the number of non-numeric values.
+    """
+    num_errors = 0
+    line_num = 1
+    while True:
+        lines = infile.readlines(chunk_size)
+        if not lines:
+            break
+        output, errors = convert_lines(lines)
+        outfile.write(output)
+        for i, arg in errors:
+            print("line {}: {!r} is not a numeric value".format(
+                    line_num + i, arg), file=sys.stderr)
+        num_errors += len(errors)
+        line_num += len(lines)
+    return num_errors
+
+def find_chunks(data, chunk_size):
+    """(bytes, int): iterator of (int, int)
+
+    Splits 'data' into pieces of about 'chunk_size' bytes that each
+    end at the end of a line, generating their (start, end) offsets.
+    """
+    size = len(data)
+    start = 0
+    while start < size:
+        end = data.find(b'\n', start + chunk_size - 1)
+        if end == -1:
+            end = size
+        else:
+            end += 1
+        yield start, end
+        start = end
+
+def convert_chunk(args):
+    """((str, int, int)): (str, [(int, str)], int)
+
+    Converts the lines between the 'start' and 'end' offsets of the
+    named file.  Returns the output text, the list of (index, value)
+    pairs for non-numeric values, and the number of lines converted.
+    """
+    import mmap
+
+    filename, start, end = args
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunk = data[start:end]
+    # Split only at newlines, as convert_stream() does.
+    if chunk.endswith(b'\n'):
+        chunk = chunk[:-1]
+    lines = chunk.decode().split('\n')
+    output, errors = convert_lines(lines)
+    return output, errors, len(lines)
+
+def convert_file_parallel(filename, outfile, workers=None,
+                          chunk_size=CHUNK_SIZE):
+    """(str, file, int, int): int
+
+    Converts the Fahrenheit values in the named file, one per line,
+    using a pool of 'workers' processes (by default, one for each CPU).
+    The file is memory-mapped and split into chunks of about
+    'chunk_size' bytes, each holding whole lines; each worker maps the
+    file itself, so only the chunk offsets and the converted text are
+    passed between processes.  At most two chunks per worker are in
+    progress at once, so memory use doesn't grow with the size of the
+    file.  The results are written to 'outfile' in the original order.
+    Returns the number of non-numeric values.
+    """
+    import collections, mmap
+    from concurrent import futures
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    num_errors = 0
+    line_num = 1
+
+    def write_result(future):
+        nonlocal num_errors, line_num
+        output, errors, num_lines = future.result()
+        outfile.write(output)
+        for i, arg in errors:
+            print("line {}: {!r} is not a numeric value".format(
+                    line_num + i, arg), file=sys.stderr)
+        num_errors += len(errors)
+        line_num += num_lines
+
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+             futures.ProcessPoolExecutor(workers) as executor:
+            pending = collections.deque()
+            for start, end in find_chunks(data, chunk_size):
+                if len(pending) >= 2 * workers:
+                    write_result(pending.popleft())
+                pending.append(executor.submit(convert_chunk,
+                                               (filename, start, end)))
+            while pending:
+                write_result(pending.popleft())
+    return num_errors
+
+def convert_request(line):
+    """(bytes): bytes
+
+    Handles one request to the conversion server.  A request is a line
+    of whitespace-separated Fahrenheit values, and the reply is a line
+    containing the Celsius values in the same order, separated by
+    spaces, with '?' for non-numeric values.
+    """
+    results = []
+    for arg in line.split():
+        try:
+            results.append(repr(convert_f2c(arg)))
+        except ValueError:
+            results.append('?')
+    return (' '.join(results) + '\n').encode('ascii')
+
+def make_server(path):
+    """(str): ThreadingUnixStreamServer
+
+    Creates a conversion server listening on the Unix domain socket
+    at 'path', removing any socket left behind by an earlier server.
+    A client can send any number of requests over one connection.
+    """
+    import socketserver, stat
+
+    class ConversionHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                self.wfile.write(convert_request(line))
+                self.wfile.flush()
+
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    class ConversionServer(socketserver.ThreadingUnixStreamServer):
+        # Clients keep their connections open, so don't wait for them
+        # when the server is closed.
+        daemon_threads = True
+        block_on_close = False
+
+    return ConversionServer(path, ConversionHandler)
+
+def serve(path):
+    """(str)
+
+    Runs a conversion server on the Unix domain socket at 'path'
+    until interrupted.
+    """
+    server = make_server(path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
+
+class ConversionClient:
+    """Client for the conversion server.
+
+    Methods:
+    convert(values) -- convert a list of Fahrenheit strings
+    close() -- close the connection
+    """
+    def __init__(self, path):
+        import socket
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.rfile = self.sock.makefile('rb')
+
+    def convert(self, values):
+        """([str]): [float or None]
+
+        Returns the Celsius value for each of the Fahrenheit strings,
+        or None for values that aren't numeric.
+        """
+        for arg in values:
+            if not arg or arg.split() != [arg]:
+                raise ValueError("Value {!r} is empty or contains "
+                                 "whitespace".format(arg))
+        self.sock.sendall((' '.join(values) + '\n').encode())
+        reply = self.rfile.readline().decode('ascii').split()
+        return [None if r == '?' else float(r) for r in reply]
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def print_results(args, results):
+    """([str], [float or None])
+
+    Prints the conversion of each Fahrenheit string in 'args' to the
+    corresponding Celsius value in 'results', or an error message if
+    the value is None.
+    """
+    for arg, celsius in zip(args, results):
+        if celsius is None:
+            print("{!r} is not a numeric value".format(arg),
+                  file=sys.stderr)
+        else:
+            print(format_result(arg, celsius))
+
+def usage():
+    print('Usage: {} temp1 temp2 ...'.format(sys.argv[0]))
+    print('       {} --stream [file ...]'.format(sys.argv[0]))
+    print('       {} --parallel file ...'.format(sys.argv[0]))
+    print('       {} --serve socket'.format(sys.argv[0]))
+    print('       {} --connect socket temp1 temp2 ...'.format(
+            sys.argv[0]))
+    sys.exit(0)
+
 def main():
     # If no arguments were given, print a helpful message
     if len(sys.argv) == 1:
-        print('Usage: {} temp1 temp2 ...'.format(sys.argv[0]))
-        sys.exit(0)
+        usage()
+
+    # In streaming mode, convert the values in the files
+    # or on standard input.
+    if sys.argv[1] == '--stream':
+        for filename in sys.argv[2:] or ['-']:
+            if filename == '-':
+                convert_stream(sys.stdin, sys.stdout)
+            else:
+                with open(filename) as f:
+                    convert_stream(f, sys.stdout)
+        return
+
+    # In parallel mode, convert each file using all of the CPUs.
+    if sys.argv[1] == '--parallel':
+        for filename in sys.argv[2:]:
+            convert_file_parallel(filename, sys.stdout)
+        return
+
+    # Run a conversion server, or convert values using one.
+    # Both need the path of the socket.
+    if sys.argv[1] in ('--serve', '--connect') and len(sys.argv) < 3:
+        usage()
+
+    if sys.argv[1] == '--serve':
+        serve(sys.argv[2])
+        return
+
+    if sys.argv[1] == '--connect':
+        args = sys.argv[3:]
+        with ConversionClient(sys.argv[2]) as client:
+            print_results(args, client.convert(args))
+        return
 
     # Loop over the arguments
     for arg in sys.argv[1:]:
@@ -26,8 +334,7 @@ def main():
             print("{!r} is not a numeric value".format(arg),
                   file=sys.stderr)
         else:
-            print('{}\N{DEGREE SIGN}F = {:g}\N{DEGREE SIGN}C'.format(
-                    arg, round(celsius, 0)))
+            print(format_result(arg, celsius))
 
 if __name__ == '__main__':
     main()
@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
+import argparse
 import sys
 import turtle
 
+import render
+
 def border(t, screen_x, screen_y):
     """(Turtle, int, int)
 
@@ -43,16 +46,11 @@ def square(t, size, color):
         t.forward(size)
         t.right(90)
 
-def main():
-    # Create screen and turtle.
-    screen = turtle.Screen()
-    screen.title('Square Demo')
-    screen_x, screen_y = screen.screensize()
-    t = turtle.Turtle()
-
-    # Uncomment to draw the graphics as quickly as possible.
-    ##t.speed(0)
+def draw(t, screen_x, screen_y):
+    """(Turtle, int, int)
 
+    Draws the border and a set of nested squares.
+    """
     # Draw a border around the canvas
     border(t, screen_x, screen_y)
 
@@ -63,6 +61,41 @@ def main():
     for i, color in enumerate(colors):
         square(t, (screen_y / 2) / 10 * (i+1), color)
 
+def main():
+    parser = argparse.ArgumentParser(description='turtle graphics demo')
+    parser.add_argument('--fast', default=False, action='store_true',
+                        help='draw the graphics as quickly as possible')
+    parser.add_argument('--output', default=None, metavar='file',
+                        help='write the drawing to an image file '
+                             '(.png, .svg, or .ps) instead of a window')
+    args = parser.parse_args()
+
+    if args.output is not None:
+        # Record the drawing and write it out, without any window.
+        # The size is that of the default turtle screen.
+        screen_x, screen_y = 400, 300
+        t = render.RecordingTurtle()
+        draw(t, screen_x, screen_y)
+        target = render.ImageTarget(screen_x, screen_y)
+        target.flush(t.finish())
+        target.save(args.output)
+        return
+
+    # Create screen and turtle.
+    screen = turtle.Screen()
+    screen.title('Square Demo')
+    screen_x, screen_y = screen.screensize()
+    t = turtle.Turtle()
+
+    # Draw the graphics as quickly as possible, updating
+    # the screen only once at the end.
+    if args.fast:
+        t.speed(0)
+        screen.tracer(0)
+
+    draw(t, screen_x, screen_y)
+    screen.update()
+
     print('Hit any key to exit')
     dummy = input()
         